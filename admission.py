@@ -0,0 +1,142 @@
+"""
+Admission control for the API routes.
+
+Every route decorated with @admit(route_class) takes a token from the
+current user's bucket for that class first, so one user refreshing the
+budget page can't crowd out everyone else. The analytics class also has a
+cap on how many requests run at once; past it, requests are turned away with
+429 and Retry-After instead of queueing for a worker. Buckets and the cap
+live in memory, so they apply per worker process.
+"""
+import math
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, jsonify
+from flask_login import current_user
+
+
+class TokenBuckets:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._buckets = {}  # key -> [tokens, last refill]
+        self._lock = threading.Lock()
+        self._next_purge = time.monotonic() + self._idle_after()
+
+    def _idle_after(self):
+        # A bucket left alone this long is full again, the same as a new one
+        return self.burst / self.rate
+
+    def take(self, key):
+        """Take a token for key. Returns 0, or the seconds until one is available."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            if tokens >= 1:
+                self._buckets[key] = [tokens - 1, now]
+                wait = 0
+            else:
+                self._buckets[key] = [tokens, now]
+                wait = (1 - tokens) / self.rate
+
+            if now >= self._next_purge:
+                idle = self._idle_after()
+                self._buckets = {k: v for k, v in self._buckets.items() if now - v[1] < idle}
+                self._next_purge = now + idle
+        return wait
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class AdmissionController:
+    def __init__(self, limits, max_concurrent):
+        """limits maps route class -> (tokens per second, burst).
+
+        max_concurrent maps route class -> how many of its requests may run
+        at once in this process.
+        """
+        self._buckets = {name: TokenBuckets(rate, burst) for name, (rate, burst) in limits.items()}
+        self._slots = {name: threading.BoundedSemaphore(n) for name, n in max_concurrent.items()}
+        self._max_concurrent = dict(max_concurrent)
+        self._lock = threading.Lock()
+        self._metrics = {
+            name: {'admitted': 0, 'rate_limited': 0, 'over_capacity': 0, 'in_flight': 0, 'peak_in_flight': 0}
+            for name in limits
+        }
+
+    def _count(self, route_class, field, delta=1):
+        with self._lock:
+            metrics = self._metrics[route_class]
+            metrics[field] += delta
+            if field == 'in_flight':
+                metrics['peak_in_flight'] = max(metrics['peak_in_flight'], metrics['in_flight'])
+
+    def acquire(self, route_class, user_key):
+        """Admit one request. Returns 0, or the Retry-After seconds if it is refused."""
+        wait = self._buckets[route_class].take(user_key)
+        if wait:
+            self._count(route_class, 'rate_limited')
+            return max(1, math.ceil(wait))
+
+        slots = self._slots.get(route_class)
+        if slots is not None and not slots.acquire(blocking=False):
+            self._count(route_class, 'over_capacity')
+            return 1
+
+        self._count(route_class, 'admitted')
+        self._count(route_class, 'in_flight')
+        return 0
+
+    def release(self, route_class):
+        self._count(route_class, 'in_flight', -1)
+        slots = self._slots.get(route_class)
+        if slots is not None:
+            slots.release()
+
+    def metrics(self):
+        with self._lock:
+            report = {name: dict(metrics) for name, metrics in self._metrics.items()}
+        for name, metrics in report.items():
+            bucket = self._buckets[name]
+            metrics['rate'] = bucket.rate
+            metrics['burst'] = bucket.burst
+            metrics['max_concurrent'] = self._max_concurrent.get(name)
+            metrics['tracked_users'] = len(bucket)
+        return report
+
+
+def admit(route_class):
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            controller = current_app.extensions.get('admission')
+            if controller is None:
+                return view(*args, **kwargs)
+
+            retry_after = controller.acquire(route_class, current_user.get_id())
+            if retry_after:
+                return jsonify({'error': 'Too many requests, try again shortly'}), 429, {
+                    'Retry-After': str(retry_after)
+                }
+            try:
+                return view(*args, **kwargs)
+            finally:
+                controller.release(route_class)
+        return wrapper
+    return decorator
+
+
+def init_admission(app):
+    controller = AdmissionController(
+        limits={
+            'analytics': (app.config['ANALYTICS_RATE'], app.config['ANALYTICS_BURST']),
+            'crud': (app.config['CRUD_RATE'], app.config['CRUD_BURST'])
+        },
+        max_concurrent={'analytics': app.config['ANALYTICS_MAX_CONCURRENT']}
+    )
+    app.extensions['admission'] = controller
+    return controller
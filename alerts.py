@@ -0,0 +1,162 @@
+"""
+Budget threshold alerts.
+
+The transaction write routes pass the transaction's values before and after
+the write to check_budget_alerts(). It works out the change in spending for
+the affected category and, for a subcategory, its parent, in the month of the
+transaction, and applies it to that category's running total for the month
+in category_spending. A total is summed from the ledger only the first time
+a budgeted category needs it; after that every write just adds its change.
+A threshold fires when the write takes spending from below to at least that
+percentage of the budget. Each threshold fires at most once per category and
+month, as a row in the notifications table.
+"""
+import calendar
+from collections import defaultdict
+
+from flask import current_app
+from sqlalchemy import func
+
+from archive import category_month_totals
+from models import db, Category, Budget, AlertThreshold, Notification, CategorySpending
+
+
+def thresholds_for(category_id):
+    """The category's alert percentages, and whether they are the defaults."""
+    percents = db.session.execute(
+        db.select(AlertThreshold.percent)
+        .where(AlertThreshold.category_id == category_id)
+        .order_by(AlertThreshold.percent)
+    ).scalars().all()
+    if percents:
+        return percents, False
+    return sorted(current_app.config['BUDGET_ALERT_THRESHOLDS']), True
+
+
+def _spending_deltas(user_id, old, new):
+    """Change in expense spending per (category_id, year, month).
+
+    A subcategory's spending also counts towards its parent's budget, the
+    same way the budget overview adds them up.
+    """
+    deltas = defaultdict(float)
+    for values, sign in ((old, -1), (new, 1)):
+        if values is None:
+            continue
+        when, amount, transaction_type, category_id = values
+        if transaction_type != 'expense' or category_id is None:
+            continue
+
+        category = db.session.get(Category, category_id)
+        if category is None or category.user_id != user_id:
+            continue
+        deltas[(category.id, when.year, when.month)] += sign * amount
+        if category.parent_id is not None:
+            deltas[(category.parent_id, when.year, when.month)] += sign * amount
+    return deltas
+
+
+def _members(category):
+    # A top-level category is measured together with its subcategories
+    members = [category.id]
+    if category.parent_id is None:
+        members += [sub.id for sub in category.subcategories]
+    return members
+
+
+def _check_category(user_id, category, year, month, delta):
+    running = db.session.get(CategorySpending, (category.id, year, month))
+    if running is not None:
+        before = running.total
+        running.total = round(before + delta, 2)
+
+    # Spending that went down can't cross a threshold
+    if delta <= 0:
+        return []
+
+    members = _members(category)
+    budgeted = db.session.query(func.sum(Budget.amount)).filter(
+        Budget.category_id.in_(members),
+        Budget.month == month,
+        Budget.year == year
+    ).scalar() or 0
+    if budgeted <= 0:
+        return []
+
+    if running is None:
+        # First write to a budgeted month: start the total from the ledger,
+        # which already holds this write
+        totals = category_month_totals(user_id, year, month, 'expense')
+        running = CategorySpending(
+            user_id=user_id,
+            category_id=category.id,
+            year=year,
+            month=month,
+            total=round(sum(totals.get(member, 0) for member in members), 2)
+        )
+        db.session.add(running)
+        before = round(running.total - delta, 2)
+    spent = running.total
+
+    percents, _ = thresholds_for(category.id)
+    crossed = [p for p in percents if before < round(budgeted * p / 100, 2) <= spent]
+    if not crossed:
+        return []
+
+    already = set(db.session.execute(
+        db.select(Notification.threshold).where(
+            Notification.category_id == category.id,
+            Notification.year == year,
+            Notification.month == month,
+            Notification.threshold.in_(crossed)
+        )
+    ).scalars())
+
+    created = []
+    for percent in crossed:
+        if percent in already:
+            continue
+        notification = Notification(
+            user_id=user_id,
+            category_id=category.id,
+            month=month,
+            year=year,
+            threshold=percent,
+            spent=spent,
+            budgeted=budgeted,
+            message=(
+                f'{category.name} has reached {percent}% of its budget for '
+                f'{calendar.month_name[month]} {year}: {spent:.2f} of {budgeted:.2f} spent'
+            )
+        )
+        db.session.add(notification)
+        created.append(notification)
+    return created
+
+
+def check_budget_alerts(user_id, old=None, new=None):
+    """Update running totals and raise alerts for thresholds a transaction
+    write pushed spending past.
+
+    old and new are (date, amount, transaction_type, category_id) tuples of
+    the transaction before and after the write, or None; deletes pass only
+    old. Call before commit. Returns the new Notifications.
+    """
+    # Flush the write first, so a total started from the ledger includes it
+    db.session.flush()
+
+    created = []
+    for (category_id, year, month), delta in _spending_deltas(user_id, old, new).items():
+        if delta == 0:
+            continue
+        created += _check_category(user_id, db.session.get(Category, category_id), year, month, delta)
+    return created
+
+
+def forget_spending(user_id):
+    """Drop user_id's running totals, after transactions moved between
+    categories in bulk. They are summed again when next needed."""
+    db.session.execute(
+        db.delete(CategorySpending).where(CategorySpending.user_id == user_id),
+        execution_options={'synchronize_session': False}
+    )
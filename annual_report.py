@@ -0,0 +1,112 @@
+"""
+Generate annual reports from the command line.
+
+Each user's years are fetched in bulk, then the months of every report are
+computed together on a process pool. Reports for closed years are cached,
+so the web endpoint serves them without recomputing.
+
+Usage:
+    python annual_report.py --year 2025 [--to 2026] [--user ID | --all-users]
+                            [--workers N] [--no-cache] [--output reports.json]
+"""
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+from app import app, db
+from models import User
+from reports import FIRST_YEAR, LAST_YEAR, build_reports, cached_report, fetch_year, store_report
+from sharding import shard_context
+
+
+def generate(user_ids, years, workers=None, use_cache=True):
+    """{user_id: [report per year]}, computed on a pool of `workers` processes."""
+    reports = {}
+    pending = []  # (user_id, year data) still to compute
+
+    with app.app_context():
+        for uid in user_ids:
+            # Each user gets their own session, since shards can reuse ids
+            db.session.remove()
+            with shard_context(uid):
+                for year in years:
+                    report = cached_report(uid, year) if use_cache else None
+                    if report is not None:
+                        reports.setdefault(uid, {})[year] = report
+                    else:
+                        pending.append((uid, fetch_year(uid, year)))
+
+        if pending:
+            if workers == 1:
+                computed = build_reports([data for _, data in pending])
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    computed = build_reports([data for _, data in pending], executor)
+
+            fresh = {}
+            for (uid, _), report in zip(pending, computed):
+                reports.setdefault(uid, {})[report['year']] = report
+                fresh.setdefault(uid, []).append(report)
+
+            for uid, user_reports in fresh.items():
+                db.session.remove()
+                with shard_context(uid):
+                    for report in user_reports:
+                        store_report(uid, report)
+                    db.session.commit()
+
+    return {uid: [reports[uid][year] for year in years] for uid in user_ids}, len(pending)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate annual budget reports')
+    parser.add_argument('--year', type=int, default=date.today().year, help='first year of the report')
+    parser.add_argument('--to', type=int, help='last year, for a multi-year run')
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--user', type=int, help='report on this user')
+    target.add_argument('--all-users', action='store_true', help='report on every user')
+    parser.add_argument('--workers', type=int, help='processes in the pool (1 computes in this process)')
+    parser.add_argument('--no-cache', action='store_true', help='recompute closed years even if cached')
+    parser.add_argument('--output', help='write the reports to this JSON file')
+    args = parser.parse_args(argv)
+
+    last_year = args.to if args.to is not None else args.year
+    if not FIRST_YEAR <= args.year <= LAST_YEAR or not FIRST_YEAR <= last_year <= LAST_YEAR:
+        sys.exit(f'Years must be between {FIRST_YEAR} and {LAST_YEAR}')
+    if last_year < args.year:
+        sys.exit('--to must not be before --year')
+    years = list(range(args.year, last_year + 1))
+
+    with app.app_context():
+        if args.all_users:
+            user_ids = [user.id for user in User.query.order_by(User.id).all()]
+        elif args.user is not None:
+            user_ids = [args.user]
+        else:
+            sys.exit('Pass --user ID or --all-users')
+
+    started = time.perf_counter()
+    reports, computed = generate(user_ids, years, args.workers, not args.no_cache)
+    seconds = time.perf_counter() - started
+
+    for uid, user_reports in reports.items():
+        for report in user_reports:
+            totals = report['totals']
+            rate = f"{totals['savings_rate']:.1%}" if totals['savings_rate'] is not None else 'n/a'
+            print(f"User {uid}, {report['year']}: income {totals['income']:.2f}, "
+                  f"expenses {totals['expenses']:.2f} (budget {totals['budgeted']:.2f}), savings rate {rate}")
+
+    total = len(user_ids) * len(years)
+    print(f"{total} reports, {computed} computed and {total - computed} from the cache, in {seconds:.2f}s")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({str(uid): user_reports for uid, user_reports in reports.items()}, f, indent=2)
+        print(f'Reports written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
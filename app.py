@@ -1,15 +1,30 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash
+from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, abort
 from flask_cors import CORS
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
-from models import db, User, Category, Transaction, Budget
+from models import (
+    db, User, Category, Transaction, Budget, ChangeLog, ArchivedTransaction, CategoryRollup, AlertThreshold, Notification
+)
 from config import Config
-from datetime import datetime
+from sharding import init_sharding
+from schema_upgrades import upgrade_transaction_ids
+from read_routing import init_read_routing, read_only
+from admission import init_admission, admit
+from archive import category_month_totals, daily_totals, restore_transaction, rebuild_rollups
+from assets import init_assets
+from projections import transaction_dicts, budget_dicts
+from forecast import load_state, project, record_transaction_change, invalidate, category_key
+from reports import FIRST_YEAR, LAST_YEAR, annual_reports, invalidate_reports
+from alerts import check_budget_alerts, forget_spending, thresholds_for
+from login_security import PasswordVerifier, AttemptThrottle, VerifierBusy
+from datetime import datetime, timezone
+import math
 
 app = Flask(__name__)
 app.config.from_object(Config)
 
 CORS(app)
 db.init_app(app)
+init_assets(app)
 
 # Flask-Login setup
 login_manager = LoginManager()
@@ -21,9 +36,68 @@ login_manager.login_message = 'Please log in to access this page.'
 def load_user(user_id):
     return User.query.get(int(user_id))
 
+# Login protection
+password_verifier = PasswordVerifier(
+    workers=app.config['LOGIN_VERIFY_WORKERS'],
+    max_pending=app.config['LOGIN_VERIFY_MAX_PENDING'],
+    timeout=app.config['LOGIN_VERIFY_TIMEOUT'],
+    request_threads=app.config['LOGIN_REQUEST_THREADS'],
+    method=app.config['PASSWORD_HASH_METHOD'],
+    salt_length=app.config['PASSWORD_HASH_SALT_LENGTH']
+)
+login_throttle = AttemptThrottle(window=app.config['LOGIN_ATTEMPT_WINDOW'])
+
+if app.config['ADMISSION_CONTROL']:
+    init_admission(app)
+
 # Create tables
 with app.app_context():
-    db.create_all()
+    if app.config['SHARDED_STORAGE']:
+        init_sharding(app, db)
+    else:
+        db.create_all()
+        upgrade_transaction_ids(db.engine, db.metadata)
+    if app.config['READ_ROUTING']:
+        init_read_routing(app, db)
+
+def record_changes(entity, ids, operation='upsert'):
+    """Append entries to the current user's change log before committing.
+
+    ids is either a list of ids or a select() of them, so bulk statements can
+    log their rows without loading them.
+    """
+    if isinstance(ids, list):
+        if ids:
+            db.session.execute(db.insert(ChangeLog), [{
+                'user_id': current_user.id,
+                'entity': entity,
+                'entity_id': entity_id,
+                'operation': operation
+            } for entity_id in ids])
+        return
+
+    rows = ids.add_columns(
+        db.literal(current_user.id),
+        db.literal(entity),
+        db.literal(operation),
+        db.literal(datetime.now(timezone.utc))
+    )
+    db.session.execute(db.insert(ChangeLog).from_select(
+        ['entity_id', 'user_id', 'entity', 'operation', 'created_at'], rows
+    ))
+
+def parse_amount(value):
+    """A transaction amount from JSON as a float, or None if it isn't a number."""
+    if isinstance(value, bool):
+        return None
+    try:
+        amount = float(value)
+    except (TypeError, ValueError):
+        return None
+    return amount if math.isfinite(amount) else None
+
+def forecast_values(transaction):
+    return (transaction.date, transaction.amount, transaction.transaction_type, transaction.category_id)
 
 # Authentication routes
 @app.route('/login', methods=['GET', 'POST'])
@@ -36,9 +110,44 @@ def login():
         username = data.get('username')
         password = data.get('password')
 
+        # Throttle before doing any hashing work
+        username_key = f'user:{username}'
+        ip_key = f'ip:{request.remote_addr}'
+        retry_after = max(
+            login_throttle.retry_after(username_key, app.config['LOGIN_MAX_ATTEMPTS_PER_USERNAME']),
+            login_throttle.retry_after(ip_key, app.config['LOGIN_MAX_ATTEMPTS_PER_IP'])
+        )
+        if retry_after:
+            message = 'Too many login attempts. Please try again later.'
+            if request.is_json:
+                return jsonify({'success': False, 'message': message}), 429, {'Retry-After': str(retry_after)}
+            flash(message, 'error')
+            return render_template('login.html'), 429, {'Retry-After': str(retry_after)}
+
+        login_throttle.hit(username_key)
+        login_throttle.hit(ip_key)
+
         user = User.query.filter_by(username=username).first()
 
-        if user and user.check_password(password):
+        try:
+            valid = bool(user and password) and password_verifier.verify(user.password_hash, password)
+        except VerifierBusy:
+            message = 'The server is busy. Please try again in a moment.'
+            if request.is_json:
+                return jsonify({'success': False, 'message': message}), 503, {'Retry-After': '1'}
+            flash(message, 'error')
+            return render_template('login.html'), 503, {'Retry-After': '1'}
+
+        if valid:
+            login_throttle.reset(username_key)
+
+            # Upgrade hashes made with older parameters, if a worker is free
+            if password_verifier.needs_rehash(user.password_hash):
+                password_hash = password_verifier.rehash(password)
+                if password_hash is not None:
+                    user.password_hash = password_hash
+                    db.session.commit()
+
             login_user(user, remember=True)
             if request.is_json:
                 return jsonify({'success': True, 'message': 'Logged in successfully'}), 200
@@ -114,6 +223,7 @@ def index():
 # Category routes
 @app.route('/api/categories', methods=['GET'])
 @login_required
+@admit('crud')
 def get_categories():
     category_type = request.args.get('type', 'expense')
     categories = Category.query.filter_by(
@@ -125,6 +235,7 @@ def get_categories():
 
 @app.route('/api/categories', methods=['POST'])
 @login_required
+@admit('crud')
 def create_category():
     data = request.json
     category = Category(
@@ -134,40 +245,136 @@ def create_category():
         user_id=current_user.id
     )
     db.session.add(category)
+    db.session.flush()
+    record_changes('category', [category.id])
     db.session.commit()
     return jsonify(category.to_dict()), 201
 
 @app.route('/api/categories/<int:id>', methods=['PUT'])
 @login_required
+@admit('crud')
 def update_category(id):
     category = Category.query.filter_by(id=id, user_id=current_user.id).first_or_404()
     data = request.json
     category.name = data['name']
+    record_changes('category', [category.id])
+    invalidate_reports(current_user.id)
     db.session.commit()
     return jsonify(category.to_dict())
 
 @app.route('/api/categories/<int:id>', methods=['DELETE'])
 @login_required
+@admit('crud')
 def delete_category(id):
     category = Category.query.filter_by(id=id, user_id=current_user.id).first_or_404()
-    db.session.delete(category)
+
+    # What to do with the transactions: 'delete' them, 'uncategorize' them,
+    # or 'reassign' them to target_id
+    mode = request.args.get('transactions', 'delete')
+    target_id = request.args.get('target_id', type=int)
+
+    if mode not in ('delete', 'uncategorize', 'reassign'):
+        return jsonify({'error': 'Invalid transactions mode'}), 400
+
+    # Collect the category and all of its subcategories, one level at a time
+    category_ids = [category.id]
+    level = [category.id]
+    while level:
+        level = db.session.execute(
+            db.select(Category.id).where(
+                Category.parent_id.in_(level),
+                Category.user_id == current_user.id
+            )
+        ).scalars().all()
+        level = [cid for cid in level if cid not in category_ids]
+        category_ids.extend(level)
+
+    if mode == 'reassign':
+        if not target_id or target_id in category_ids:
+            return jsonify({'error': 'A valid target category is required'}), 400
+        Category.query.filter_by(id=target_id, user_id=current_user.id).first_or_404()
+
+    # Bulk statements, so the ORM never loads the dependent rows. Archived
+    # transactions get the same treatment.
+    for model in (Transaction, ArchivedTransaction):
+        in_categories = (
+            model.category_id.in_(category_ids),
+            model.user_id == current_user.id
+        )
+        record_changes(
+            'transaction',
+            db.select(model.id).where(*in_categories),
+            'delete' if mode == 'delete' else 'upsert'
+        )
+
+        if mode == 'delete':
+            result = db.session.execute(
+                db.delete(model).where(*in_categories),
+                execution_options={'synchronize_session': False}
+            )
+        else:
+            result = db.session.execute(
+                db.update(model).where(*in_categories).values(
+                    category_id=target_id if mode == 'reassign' else None
+                ),
+                execution_options={'synchronize_session': False}
+            )
+
+        if model is ArchivedTransaction and result.rowcount:
+            if mode == 'delete':
+                # The deleted categories' rollups go with them
+                db.session.execute(
+                    db.delete(CategoryRollup).where(
+                        CategoryRollup.category_id.in_(category_ids),
+                        CategoryRollup.user_id == current_user.id
+                    ),
+                    execution_options={'synchronize_session': False}
+                )
+            else:
+                # The rows join other categories' months, so total them again
+                rebuild_rollups(current_user.id)
+
+    record_changes('budget', db.select(Budget.id).where(Budget.category_id.in_(category_ids)), 'delete')
+    record_changes('category', category_ids, 'delete')
+    invalidate(current_user.id)
+    invalidate_reports(current_user.id)
+    forget_spending(current_user.id)
+
+    for model in (Budget, AlertThreshold, Notification):
+        db.session.execute(
+            db.delete(model).where(model.category_id.in_(category_ids)),
+            execution_options={'synchronize_session': False}
+        )
+    db.session.execute(
+        db.delete(Category).where(
+            Category.id.in_(category_ids),
+            Category.user_id == current_user.id
+        ),
+        execution_options={'synchronize_session': False}
+    )
     db.session.commit()
     return '', 204
 
 # Transaction routes
 @app.route('/api/transactions', methods=['GET'])
 @login_required
+@admit('crud')
 def get_transactions():
-    transactions = Transaction.query.filter_by(user_id=current_user.id).order_by(Transaction.date.desc()).all()
-    return jsonify([t.to_dict() for t in transactions])
+    # Plain rows rather than ORM objects; includes archived transactions
+    return jsonify(transaction_dicts(current_user.id))
 
 @app.route('/api/transactions', methods=['POST'])
 @login_required
+@admit('crud')
 def create_transaction():
     data = request.json
+    amount = parse_amount(data.get('amount'))
+    if amount is None:
+        return jsonify({'error': 'amount must be a number'}), 400
+
     transaction = Transaction(
         description=data['description'],
-        amount=data['amount'],
+        amount=amount,
         date=datetime.fromisoformat(data['date']),
         transaction_type=data['transaction_type'],
         category_id=data.get('category_id'),
@@ -175,38 +382,116 @@ def create_transaction():
         user_id=current_user.id
     )
     db.session.add(transaction)
+    db.session.flush()
+    record_changes('transaction', [transaction.id])
+    record_transaction_change(current_user.id, new=forecast_values(transaction))
+    check_budget_alerts(current_user.id, new=forecast_values(transaction))
+    invalidate_reports(current_user.id, [transaction.date.year])
     db.session.commit()
     return jsonify(transaction.to_dict()), 201
 
 @app.route('/api/transactions/<int:id>', methods=['PUT'])
 @login_required
+@admit('crud')
 def update_transaction(id):
-    transaction = Transaction.query.filter_by(id=id, user_id=current_user.id).first_or_404()
     data = request.json
+    amount = parse_amount(data.get('amount'))
+    if amount is None:
+        return jsonify({'error': 'amount must be a number'}), 400
+
+    transaction = Transaction.query.filter_by(id=id, user_id=current_user.id).first()
+    if transaction is None:
+        # Archived transactions move back to the hot table when edited
+        transaction = restore_transaction(current_user.id, id) or abort(404)
+    old_values = forecast_values(transaction)
 
     transaction.description = data['description']
-    transaction.amount = data['amount']
+    transaction.amount = amount
     transaction.date = datetime.fromisoformat(data['date'])
     transaction.transaction_type = data['transaction_type']
     transaction.category_id = data.get('category_id')
     transaction.notes = data.get('notes')
 
+    record_changes('transaction', [transaction.id])
+    record_transaction_change(current_user.id, old=old_values, new=forecast_values(transaction))
+    check_budget_alerts(current_user.id, old=old_values, new=forecast_values(transaction))
+    invalidate_reports(current_user.id, {old_values[0].year, transaction.date.year})
     db.session.commit()
     return jsonify(transaction.to_dict())
 
 @app.route('/api/transactions/<int:id>', methods=['DELETE'])
 @login_required
+@admit('crud')
 def delete_transaction(id):
-    transaction = Transaction.query.filter_by(id=id, user_id=current_user.id).first_or_404()
+    transaction = Transaction.query.filter_by(id=id, user_id=current_user.id).first()
+    if transaction is None:
+        transaction = restore_transaction(current_user.id, id) or abort(404)
+    old_values = forecast_values(transaction)
+    record_changes('transaction', [transaction.id], 'delete')
+    record_transaction_change(current_user.id, old=old_values)
+    invalidate_reports(current_user.id, [transaction.date.year])
     db.session.delete(transaction)
+    check_budget_alerts(current_user.id, old=old_values)
     db.session.commit()
     return '', 204
 
+# Change log routes
+@app.route('/api/changes', methods=['GET'])
+@login_required
+@admit('crud')
+def get_changes():
+    since = request.args.get('since', type=int)
+    latest = db.session.query(db.func.max(ChangeLog.id)).filter(
+        ChangeLog.user_id == current_user.id
+    ).scalar() or 0
+
+    # Without a starting point, just report where the log is up to
+    if since is None:
+        return jsonify({'seq': latest})
+
+    changes = db.session.query(ChangeLog.entity, ChangeLog.entity_id, ChangeLog.operation).filter(
+        ChangeLog.user_id == current_user.id,
+        ChangeLog.id > since,
+        ChangeLog.id <= latest
+    ).order_by(ChangeLog.id).all()
+
+    # Only the last operation on each row matters
+    last_operation = {}
+    for entity, entity_id, operation in changes:
+        last_operation[(entity, entity_id)] = operation
+
+    models = {
+        'transaction': (Transaction, 'transactions'),
+        'category': (Category, 'categories'),
+        'budget': (Budget, 'budgets')
+    }
+    result = {'seq': latest}
+    for entity, (model, key) in models.items():
+        upserted = [i for (e, i), op in last_operation.items() if e == entity and op == 'upsert']
+        deleted = [i for (e, i), op in last_operation.items() if e == entity and op == 'delete']
+
+        rows = []
+        if upserted:
+            rows = model.query.filter(model.id.in_(upserted), model.user_id == current_user.id).all()
+        if model is Transaction and len(rows) < len(upserted):
+            rows += ArchivedTransaction.query.filter(
+                ArchivedTransaction.id.in_(upserted),
+                ArchivedTransaction.user_id == current_user.id
+            ).all()
+
+        if model is Category:
+            result[key] = [row.to_dict(include_subcategories=False) for row in rows]
+        else:
+            result[key] = [row.to_dict() for row in rows]
+        result[f'deleted_{key}'] = deleted
+
+    return jsonify(result)
+
 @app.route('/api/category-details/<int:category_id>', methods=['GET'])
 @login_required
+@admit('analytics')
+@read_only
 def get_category_details(category_id):
-    from sqlalchemy import extract
-
     month = request.args.get('month', type=int)
     year = request.args.get('year', type=int)
 
@@ -225,14 +510,11 @@ def get_category_details(category_id):
         year=year
     ).join(Category).filter(Category.user_id == current_user.id).first()
 
+    # Spending per category for the month, including archived transactions
+    spent = category_month_totals(current_user.id, year, month, 'expense')
+
     # Get spending for parent category in the current month (not including subcategories)
-    parent_spent = db.session.query(db.func.sum(Transaction.amount)).filter(
-        Transaction.category_id == category_id,
-        Transaction.transaction_type == 'expense',
-        Transaction.user_id == current_user.id,
-        extract('month', Transaction.date) == month,
-        extract('year', Transaction.date) == year
-    ).scalar() or 0
+    parent_spent = spent.get(category_id, 0)
 
     # Get subcategories with their budgets and spending
     subcategories_data = []
@@ -246,13 +528,7 @@ def get_category_details(category_id):
             year=year
         ).join(Category).filter(Category.user_id == current_user.id).first()
 
-        sub_spent = db.session.query(db.func.sum(Transaction.amount)).filter(
-            Transaction.category_id == sub.id,
-            Transaction.transaction_type == 'expense',
-            Transaction.user_id == current_user.id,
-            extract('month', Transaction.date) == month,
-            extract('year', Transaction.date) == year
-        ).scalar() or 0
+        sub_spent = spent.get(sub.id, 0)
 
         sub_budget_amount = sub_budget.amount if sub_budget else 0
         total_sub_budget += sub_budget_amount
@@ -282,9 +558,10 @@ def get_category_details(category_id):
 
 @app.route('/api/spending-comparison', methods=['GET'])
 @login_required
+@admit('analytics')
+@read_only
 def get_spending_comparison():
-    from sqlalchemy import extract, func
-    from collections import defaultdict
+    from sqlalchemy import func
 
     # Get current date
     now = datetime.now()
@@ -299,31 +576,9 @@ def get_spending_comparison():
         prev_month = current_month - 1
         prev_year = current_year
 
-    # Get current month's daily spending
-    current_spending = db.session.query(
-        extract('day', Transaction.date).label('day'),
-        func.sum(Transaction.amount).label('total')
-    ).filter(
-        Transaction.transaction_type == 'expense',
-        Transaction.user_id == current_user.id,
-        extract('month', Transaction.date) == current_month,
-        extract('year', Transaction.date) == current_year
-    ).group_by(extract('day', Transaction.date)).all()
-
-    # Get previous month's daily spending
-    prev_spending = db.session.query(
-        extract('day', Transaction.date).label('day'),
-        func.sum(Transaction.amount).label('total')
-    ).filter(
-        Transaction.transaction_type == 'expense',
-        Transaction.user_id == current_user.id,
-        extract('month', Transaction.date) == prev_month,
-        extract('year', Transaction.date) == prev_year
-    ).group_by(extract('day', Transaction.date)).all()
-
-    # Convert to dictionaries for easier lookup
-    current_by_day = {int(day): float(total) for day, total in current_spending}
-    prev_by_day = {int(day): float(total) for day, total in prev_spending}
+    # Get daily spending for both months, including archived transactions
+    current_by_day = daily_totals(current_user.id, current_year, current_month, 'expense')
+    prev_by_day = daily_totals(current_user.id, prev_year, prev_month, 'expense')
 
     # Get the current day of month to limit comparison
     current_day = now.day
@@ -378,9 +633,9 @@ def get_spending_comparison():
 
 @app.route('/api/category-spending', methods=['GET'])
 @login_required
+@admit('analytics')
+@read_only
 def get_category_spending():
-    from sqlalchemy import extract
-
     # Get current month and year or from query params
     month = request.args.get('month', type=int)
     year = request.args.get('year', type=int)
@@ -396,28 +651,16 @@ def get_category_spending():
         user_id=current_user.id
     ).all()
     spending = []
+    spent = category_month_totals(current_user.id, year, month, 'expense')
 
     for cat in categories:
         # Get spending for current month
-        total = db.session.query(db.func.sum(Transaction.amount)).filter(
-            Transaction.category_id == cat.id,
-            Transaction.transaction_type == 'expense',
-            Transaction.user_id == current_user.id,
-            extract('month', Transaction.date) == month,
-            extract('year', Transaction.date) == year
-        ).scalar() or 0
+        total = spent.get(cat.id, 0)
 
         # Get subcategory spending for current month
         sub_total = 0
         for sub in cat.subcategories:
-            sub_amount = db.session.query(db.func.sum(Transaction.amount)).filter(
-                Transaction.category_id == sub.id,
-                Transaction.transaction_type == 'expense',
-                Transaction.user_id == current_user.id,
-                extract('month', Transaction.date) == month,
-                extract('year', Transaction.date) == year
-            ).scalar() or 0
-            sub_total += sub_amount
+            sub_total += spent.get(sub.id, 0)
 
         combined_total = total + sub_total
 
@@ -458,9 +701,59 @@ def get_category_spending():
 
     return jsonify(spending)
 
+@app.route('/api/spending-forecast', methods=['GET'])
+@login_required
+@admit('analytics')
+def get_spending_forecast():
+    today = datetime.now().date()
+    state = load_state(current_user.id, today)
+
+    categories = Category.query.filter_by(
+        parent_id=None,
+        category_type='expense',
+        user_id=current_user.id
+    ).all()
+
+    budgets = dict(db.session.query(Budget.category_id, Budget.amount).filter(
+        Budget.month == today.month,
+        Budget.year == today.year
+    ).join(Category).filter(
+        Category.category_type == 'expense',
+        Category.user_id == current_user.id
+    ).all())
+
+    forecasts = []
+    for cat in categories:
+        ids = [cat.id] + [sub.id for sub in cat.subcategories]
+        spent, forecast = project(state, [category_key(i) for i in ids], today)
+        forecasts.append({
+            'category_id': cat.id,
+            'category_name': cat.name,
+            'spent': spent,
+            'forecast': forecast,
+            'budget': sum(budgets.get(i, 0) for i in ids)
+        })
+
+    # Overall includes uncategorized spending
+    all_keys = set(state['cumulative']) | set(state['month_to_date'])
+    spent, forecast = project(state, all_keys, today)
+
+    return jsonify({
+        'month': today.month,
+        'year': today.year,
+        'day': today.day,
+        'overall': {
+            'spent': spent,
+            'forecast': forecast,
+            'budget': round(float(sum(budgets.values())), 2)
+        },
+        'categories': forecasts
+    })
+
 # Budget routes
 @app.route('/api/budgets', methods=['GET'])
 @login_required
+@admit('crud')
 def get_budgets():
     month = request.args.get('month', type=int)
     year = request.args.get('year', type=int)
@@ -470,14 +763,11 @@ def get_budgets():
         month = now.month
         year = now.year
 
-    budgets = Budget.query.filter_by(
-        month=month,
-        year=year
-    ).join(Category).filter(Category.user_id == current_user.id).all()
-    return jsonify([b.to_dict() for b in budgets])
+    return jsonify(budget_dicts(current_user.id, month, year))
 
 @app.route('/api/budgets', methods=['POST'])
 @login_required
+@admit('crud')
 def create_or_update_budget():
     data = request.json
 
@@ -495,6 +785,8 @@ def create_or_update_budget():
 
     if existing_budget:
         existing_budget.amount = data['amount']
+        record_changes('budget', [existing_budget.id])
+        invalidate_reports(current_user.id, [existing_budget.year])
         db.session.commit()
         return jsonify(existing_budget.to_dict())
     else:
@@ -506,21 +798,29 @@ def create_or_update_budget():
             user_id=current_user.id
         )
         db.session.add(budget)
+        db.session.flush()
+        record_changes('budget', [budget.id])
+        invalidate_reports(current_user.id, [budget.year])
         db.session.commit()
         return jsonify(budget.to_dict()), 201
 
 @app.route('/api/budgets/<int:id>', methods=['DELETE'])
 @login_required
+@admit('crud')
 def delete_budget(id):
     budget = Budget.query.filter_by(id=id).join(Category).filter(
         Category.user_id == current_user.id
     ).first_or_404()
+    record_changes('budget', [budget.id], 'delete')
+    invalidate_reports(current_user.id, [budget.year])
     db.session.delete(budget)
     db.session.commit()
     return '', 204
 
 @app.route('/api/budget-overview', methods=['GET'])
 @login_required
+@admit('analytics')
+@read_only
 def get_budget_overview():
     month = request.args.get('month', type=int)
     year = request.args.get('year', type=int)
@@ -531,14 +831,14 @@ def get_budget_overview():
         month = now.month
         year = now.year
 
-    from sqlalchemy import extract
-
     categories = Category.query.filter_by(
         parent_id=None,
         category_type=category_type,
         user_id=current_user.id
     ).all()
     overview = []
+    transaction_type = 'income' if category_type == 'income' else 'expense'
+    totals = category_month_totals(current_user.id, year, month, transaction_type)
 
     for cat in categories:
         budget = Budget.query.filter_by(
@@ -547,22 +847,7 @@ def get_budget_overview():
             year=year
         ).join(Category).filter(Category.user_id == current_user.id).first()
 
-        if category_type == 'income':
-            actual = db.session.query(db.func.sum(Transaction.amount)).filter(
-                Transaction.category_id == cat.id,
-                Transaction.transaction_type == 'income',
-                Transaction.user_id == current_user.id,
-                extract('month', Transaction.date) == month,
-                extract('year', Transaction.date) == year
-            ).scalar() or 0
-        else:
-            actual = db.session.query(db.func.sum(Transaction.amount)).filter(
-                Transaction.category_id == cat.id,
-                Transaction.transaction_type == 'expense',
-                Transaction.user_id == current_user.id,
-                extract('month', Transaction.date) == month,
-                extract('year', Transaction.date) == year
-            ).scalar() or 0
+        actual = totals.get(cat.id, 0)
 
         # Process subcategories
         subcategories_data = []
@@ -576,22 +861,7 @@ def get_budget_overview():
                 year=year
             ).join(Category).filter(Category.user_id == current_user.id).first()
 
-            if category_type == 'income':
-                sub_actual = db.session.query(db.func.sum(Transaction.amount)).filter(
-                    Transaction.category_id == sub.id,
-                    Transaction.transaction_type == 'income',
-                    Transaction.user_id == current_user.id,
-                    extract('month', Transaction.date) == month,
-                    extract('year', Transaction.date) == year
-                ).scalar() or 0
-            else:
-                sub_actual = db.session.query(db.func.sum(Transaction.amount)).filter(
-                    Transaction.category_id == sub.id,
-                    Transaction.transaction_type == 'expense',
-                    Transaction.user_id == current_user.id,
-                    extract('month', Transaction.date) == month,
-                    extract('year', Transaction.date) == year
-                ).scalar() or 0
+            sub_actual = totals.get(sub.id, 0)
 
             sub_budgeted = sub_budget.amount if sub_budget else 0
             total_sub_budgeted += sub_budgeted
@@ -624,5 +894,105 @@ def get_budget_overview():
 
     return jsonify(overview)
 
+# Annual report routes
+@app.route('/api/annual-report', methods=['GET'])
+@login_required
+@admit('analytics')
+def get_annual_report():
+    year = request.args.get('year', type=int)
+    if year is None:
+        year = datetime.now().year
+    last_year = request.args.get('to', type=int)
+
+    if any(not FIRST_YEAR <= y <= LAST_YEAR for y in (year, last_year) if y is not None):
+        return jsonify({'error': f'year must be between {FIRST_YEAR} and {LAST_YEAR}'}), 400
+    if last_year is None:
+        years = [year]
+    elif year <= last_year <= year + 9:
+        years = list(range(year, last_year + 1))
+    else:
+        return jsonify({'error': 'to must be between year and year + 9'}), 400
+
+    reports = annual_reports(current_user.id, years)
+    db.session.commit()
+    return jsonify(reports[0] if last_year is None else reports)
+
+# Notification routes
+@app.route('/api/notifications', methods=['GET'])
+@login_required
+@admit('crud')
+def get_notifications():
+    query = Notification.query.filter_by(user_id=current_user.id)
+    if not request.args.get('all', type=int):
+        query = query.filter(Notification.acknowledged_at.is_(None))
+    notifications = query.order_by(Notification.id.desc()).limit(100).all()
+    return jsonify([n.to_dict() for n in notifications])
+
+@app.route('/api/notifications/acknowledge', methods=['POST'])
+@login_required
+@admit('crud')
+def acknowledge_notifications():
+    # Acknowledge the given ids, or everything if none are given
+    data = request.get_json(silent=True) or {}
+    ids = data.get('ids') if isinstance(data, dict) else data
+    if not isinstance(data, dict) or ids is not None and not (
+        isinstance(ids, list) and all(isinstance(i, int) and not isinstance(i, bool) for i in ids)
+    ):
+        return jsonify({'error': 'ids must be a list of notification ids'}), 400
+
+    query = db.update(Notification).where(
+        Notification.user_id == current_user.id,
+        Notification.acknowledged_at.is_(None)
+    )
+    if ids is not None:
+        query = query.where(Notification.id.in_(ids))
+    result = db.session.execute(
+        query.values(acknowledged_at=datetime.now(timezone.utc)),
+        execution_options={'synchronize_session': False}
+    )
+    db.session.commit()
+    return jsonify({'acknowledged': result.rowcount})
+
+@app.route('/api/categories/<int:id>/alert-thresholds', methods=['GET'])
+@login_required
+@admit('crud')
+def get_alert_thresholds(id):
+    Category.query.filter_by(id=id, user_id=current_user.id).first_or_404()
+    percents, default = thresholds_for(id)
+    return jsonify({'category_id': id, 'thresholds': percents, 'default': default})
+
+@app.route('/api/categories/<int:id>/alert-thresholds', methods=['PUT'])
+@login_required
+@admit('crud')
+def update_alert_thresholds(id):
+    Category.query.filter_by(id=id, user_id=current_user.id).first_or_404()
+    percents = request.json.get('thresholds')
+
+    # An empty list goes back to the default thresholds
+    if not isinstance(percents, list) or not all(
+        isinstance(p, int) and not isinstance(p, bool) and 0 < p <= 1000 for p in percents
+    ):
+        return jsonify({'error': 'thresholds must be a list of percentages between 1 and 1000'}), 400
+
+    db.session.execute(
+        db.delete(AlertThreshold).where(AlertThreshold.category_id == id),
+        execution_options={'synchronize_session': False}
+    )
+    for percent in sorted(set(percents)):
+        db.session.add(AlertThreshold(user_id=current_user.id, category_id=id, percent=percent))
+    db.session.commit()
+
+    percents, default = thresholds_for(id)
+    return jsonify({'category_id': id, 'thresholds': percents, 'default': default})
+
+# Admission control metrics, for this worker process
+@app.route('/api/limiter-metrics', methods=['GET'])
+@login_required
+def get_limiter_metrics():
+    controller = app.extensions.get('admission')
+    if controller is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, 'classes': controller.metrics()})
+
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
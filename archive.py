@@ -0,0 +1,176 @@
+"""
+Archival of old ledger years.
+
+archive_transactions() moves a user's transactions dated before a cutoff out
+of the hot transactions table into transactions_archive, and rebuilds the
+category_rollups table of exact per-category monthly totals for the archived
+rows. The read helpers below add the archive back in when a query reaches
+into an archived range. Monthly totals come from the rollups, and daily totals
+and listings from the archive table.
+"""
+from collections import defaultdict
+from datetime import date
+
+from sqlalchemy import extract, func
+
+from schema_upgrades import has_autoincrement
+from models import db, Transaction, ArchivedTransaction, CategoryRollup
+
+TRANSACTION_COLUMNS = (
+    'id', 'description', 'amount', 'date', 'transaction_type',
+    'category_id', 'notes', 'user_id', 'created_at'
+)
+
+
+def month_range(year, month):
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return start, end
+
+
+def archived_through(user_id):
+    """Date of the newest archived transaction, or None."""
+    return db.session.query(func.max(ArchivedTransaction.date)).filter(
+        ArchivedTransaction.user_id == user_id
+    ).scalar()
+
+
+def _reaches_archive(user_id, year, month):
+    through = archived_through(user_id)
+    return through is not None and (year, month) <= (through.year, through.month)
+
+
+def archive_transactions(user_id, cutoff):
+    """Move user_id's transactions dated before cutoff into the archive.
+
+    The caller commits. Returns the number of transactions archived.
+    """
+    # Without AUTOINCREMENT new transactions could reuse archived ids
+    if not has_autoincrement(db.session.connection(bind_arguments={'mapper': Transaction})):
+        raise RuntimeError('The transactions table needs AUTOINCREMENT; start the app once to upgrade it')
+
+    columns = [getattr(Transaction, name) for name in TRANSACTION_COLUMNS]
+    old = (Transaction.user_id == user_id, Transaction.date < cutoff)
+
+    moved = db.session.execute(
+        db.insert(ArchivedTransaction).from_select(
+            list(TRANSACTION_COLUMNS), db.select(*columns).where(*old)
+        )
+    ).rowcount
+    db.session.execute(
+        db.delete(Transaction).where(*old),
+        execution_options={'synchronize_session': False}
+    )
+    rebuild_rollups(user_id)
+    return moved
+
+
+def rebuild_rollups(user_id):
+    """Recompute user_id's monthly totals from the archive table."""
+    db.session.execute(
+        db.delete(CategoryRollup).where(CategoryRollup.user_id == user_id),
+        execution_options={'synchronize_session': False}
+    )
+
+    year = extract('year', ArchivedTransaction.date)
+    month = extract('month', ArchivedTransaction.date)
+    db.session.execute(db.insert(CategoryRollup).from_select(
+        ['user_id', 'category_id', 'year', 'month', 'transaction_type', 'total', 'count'],
+        db.select(
+            ArchivedTransaction.user_id,
+            ArchivedTransaction.category_id,
+            year,
+            month,
+            ArchivedTransaction.transaction_type,
+            func.sum(ArchivedTransaction.amount),
+            func.count()
+        ).where(ArchivedTransaction.user_id == user_id).group_by(
+            ArchivedTransaction.user_id,
+            ArchivedTransaction.category_id,
+            year,
+            month,
+            ArchivedTransaction.transaction_type
+        )
+    ))
+
+
+def restore_transaction(user_id, transaction_id):
+    """Move one archived transaction back to the hot table so it can be edited.
+
+    The caller commits. Returns the Transaction, or None if there is no such
+    archived transaction.
+    """
+    archived = ArchivedTransaction.query.filter_by(id=transaction_id, user_id=user_id).first()
+    if archived is None:
+        return None
+
+    transaction = Transaction(**{name: getattr(archived, name) for name in TRANSACTION_COLUMNS})
+    db.session.delete(archived)
+    db.session.add(transaction)
+
+    # Take the one row out of its month's rollup rather than rebuilding them all
+    rollup = CategoryRollup.query.filter_by(
+        user_id=user_id,
+        category_id=archived.category_id,
+        year=archived.date.year,
+        month=archived.date.month,
+        transaction_type=archived.transaction_type
+    ).first()
+    if rollup is not None:
+        if rollup.count <= 1:
+            db.session.delete(rollup)
+        else:
+            rollup.total -= archived.amount
+            rollup.count -= 1
+
+    db.session.flush()
+    return transaction
+
+
+def category_month_totals(user_id, year, month, transaction_type):
+    """Total per category_id for one month, live and archived."""
+    start, end = month_range(year, month)
+    totals = defaultdict(float)
+
+    live = db.session.query(Transaction.category_id, func.sum(Transaction.amount)).filter(
+        Transaction.user_id == user_id,
+        Transaction.transaction_type == transaction_type,
+        Transaction.date >= start,
+        Transaction.date < end
+    ).group_by(Transaction.category_id)
+    for category_id, total in live:
+        totals[category_id] += total
+
+    if _reaches_archive(user_id, year, month):
+        rollups = db.session.query(CategoryRollup.category_id, CategoryRollup.total).filter(
+            CategoryRollup.user_id == user_id,
+            CategoryRollup.transaction_type == transaction_type,
+            CategoryRollup.year == year,
+            CategoryRollup.month == month
+        )
+        for category_id, total in rollups:
+            totals[category_id] += total
+
+    return totals
+
+
+def daily_totals(user_id, year, month, transaction_type):
+    """Total per day of the month, live and archived."""
+    start, end = month_range(year, month)
+    totals = defaultdict(float)
+
+    models = [Transaction]
+    if _reaches_archive(user_id, year, month):
+        models.append(ArchivedTransaction)
+
+    for model in models:
+        rows = db.session.query(extract('day', model.date), func.sum(model.amount)).filter(
+            model.user_id == user_id,
+            model.transaction_type == transaction_type,
+            model.date >= start,
+            model.date < end
+        ).group_by(extract('day', model.date))
+        for day, total in rows:
+            totals[int(day)] += float(total)
+
+    return totals
@@ -0,0 +1,61 @@
+"""
+Move old transactions out of the hot transactions table.
+
+Transactions dated before the cutoff (ARCHIVE_AFTER_MONTHS ago by default)
+go to the transactions_archive table, and exact per-category monthly totals
+are kept in category_rollups so historical views still work.
+
+Usage:
+    python archive_ledger.py [--months N | --before YYYY-MM-DD] [--user ID]
+"""
+import argparse
+from datetime import date
+
+from app import app, db
+from archive import archive_transactions
+from models import User
+from sharding import shard_context
+
+
+def cutoff_for(months):
+    """First day of the month `months` months before the current one."""
+    today = date.today()
+    index = today.year * 12 + (today.month - 1) - months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def archive_ledger(cutoff, user_id=None):
+    with app.app_context():
+        if user_id is None:
+            user_ids = [user.id for user in User.query.order_by(User.id).all()]
+        else:
+            user_ids = [user_id]
+
+        total = 0
+        for uid in user_ids:
+            # Each user gets their own session, since shards can reuse ids
+            db.session.remove()
+            with shard_context(uid):
+                moved = archive_transactions(uid, cutoff)
+                db.session.commit()
+            if moved:
+                print(f"  User {uid}: archived {moved} transactions")
+            total += moved
+
+        print(f"Archived {total} transactions dated before {cutoff.isoformat()}")
+        return total
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Archive old transactions')
+    parser.add_argument('--months', type=int, help='archive transactions older than this many months')
+    parser.add_argument('--before', type=date.fromisoformat, help='archive transactions dated before this day')
+    parser.add_argument('--user', type=int, help='only archive this user')
+    args = parser.parse_args()
+
+    if args.before:
+        cutoff = args.before
+    else:
+        cutoff = cutoff_for(args.months if args.months is not None else app.config['ARCHIVE_AFTER_MONTHS'])
+
+    archive_ledger(cutoff, args.user)
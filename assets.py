@@ -0,0 +1,134 @@
+"""
+Static asset pipeline.
+
+`python assets.py` minifies the dashboard CSS and JavaScript and writes
+content-hashed copies, with precompressed .gz and .br variants, to
+static/dist along with a manifest.json. With ASSET_PIPELINE enabled the app
+links those files through asset_url() and serves them from /assets with
+immutable cache headers, so repeat visits only download the HTML.
+
+Minifying needs rjsmin and rcssmin, and the .br variants need brotli. These
+are only needed to build, not to run the app.
+"""
+import gzip
+import hashlib
+import json
+import os
+import sys
+
+from flask import request, send_from_directory, url_for
+
+# Source files, relative to the static folder
+ASSET_SOURCES = ['styles.css', 'js/dashboard.js']
+
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def minify(name, source):
+    if name.endswith('.js'):
+        import rjsmin
+        return rjsmin.jsmin(source)
+    if name.endswith('.css'):
+        import rcssmin
+        return rcssmin.cssmin(source)
+    return source
+
+
+def build_assets(static_folder):
+    dist = os.path.join(static_folder, DIST_DIR)
+    os.makedirs(dist, exist_ok=True)
+
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+        print('brotli is not installed, skipping .br files')
+
+    manifest = {}
+    for name in ASSET_SOURCES:
+        with open(os.path.join(static_folder, name), encoding='utf-8') as f:
+            source = f.read()
+
+        data = minify(name, source).encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()[:12]
+        base, ext = os.path.splitext(os.path.basename(name))
+        filename = f'{base}.{digest}{ext}'
+
+        with open(os.path.join(dist, filename), 'wb') as f:
+            f.write(data)
+        with open(os.path.join(dist, filename + '.gz'), 'wb') as f:
+            f.write(gzip.compress(data, compresslevel=9, mtime=0))
+        if brotli is not None:
+            with open(os.path.join(dist, filename + '.br'), 'wb') as f:
+                f.write(brotli.compress(data, quality=11))
+
+        manifest[name] = filename
+        print(f'{name} -> {DIST_DIR}/{filename} ({len(source.encode("utf-8"))} -> {len(data)} bytes)')
+
+    # Drop bundles from earlier builds
+    keep = {MANIFEST_NAME}
+    for filename in manifest.values():
+        keep.update({filename, filename + '.gz', filename + '.br'})
+    for filename in os.listdir(dist):
+        if filename not in keep:
+            os.remove(os.path.join(dist, filename))
+
+    with open(os.path.join(dist, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    return manifest
+
+
+def init_assets(app):
+    dist = os.path.join(app.static_folder, DIST_DIR)
+    manifest = {}
+
+    if app.config['ASSET_PIPELINE']:
+        manifest_path = os.path.join(dist, MANIFEST_NAME)
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+        else:
+            app.logger.warning('ASSET_PIPELINE is on but %s is missing; run python assets.py', manifest_path)
+
+    def asset_url(name):
+        if name in manifest:
+            return url_for('assets', filename=manifest[name])
+        return url_for('static', filename=name)
+
+    @app.route('/assets/<path:filename>', endpoint='assets')
+    def serve_asset(filename):
+        # Prefer the precompressed variants the client accepts
+        accepted = request.accept_encodings
+        for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+            if accepted[encoding] and os.path.exists(os.path.join(dist, filename + suffix)):
+                response = send_from_directory(dist, filename + suffix, max_age=31536000)
+                response.headers['Content-Encoding'] = encoding
+                response.mimetype = _mimetype(filename)
+                break
+        else:
+            response = send_from_directory(dist, filename, max_age=31536000)
+
+        response.headers['Cache-Control'] = CACHE_CONTROL
+        response.vary.add('Accept-Encoding')
+        return response
+
+    app.jinja_env.globals['asset_url'] = asset_url
+
+
+def _mimetype(filename):
+    if filename.endswith('.js'):
+        return 'text/javascript'
+    if filename.endswith('.css'):
+        return 'text/css'
+    return 'application/octet-stream'
+
+
+if __name__ == '__main__':
+    static_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+    try:
+        build_assets(static_folder)
+    except ImportError as e:
+        sys.exit(f'{e}. Install rjsmin and rcssmin to build the assets.')
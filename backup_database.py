@@ -0,0 +1,253 @@
+"""
+Online backup and restore of the SQLite database.
+
+Snapshots are taken with the SQLite backup API while the app keeps running.
+Pages are copied a few at a time, so writers are only blocked for one short
+step at a time rather than for the whole copy. If writes keep restarting the
+copy, it is finished in one step, which in WAL mode doesn't block writers.
+Each snapshot is checked with PRAGMA integrity_check before it is kept, and
+only the newest BACKUP_RETENTION snapshots are kept. With sharded storage
+the shard files are included too, and a restore moves any live shard that is
+not in the snapshot aside into the backup directory.
+
+Usage:
+    python backup_database.py backup
+    python backup_database.py list
+    python backup_database.py restore <snapshot>
+"""
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import time
+from datetime import datetime
+
+from flask import Flask
+from models import db
+from config import Config
+
+# Create a new Flask app instance for maintenance
+app = Flask(__name__)
+app.config.from_object(Config)
+db.init_app(app)
+
+MAIN_FILE = 'budget.db'
+SHARDS_DIR = 'shards'
+
+
+class BackupError(Exception):
+    pass
+
+
+def _paths():
+    with app.app_context():
+        database = db.engine.url.database
+    backups = app.config.get('BACKUP_DIRECTORY') or os.path.join(app.instance_path, 'backups')
+    shards = app.config.get('SHARD_DIRECTORY') or os.path.join(app.instance_path, 'shards')
+    return database, backups, shards
+
+
+def _databases(database, shards):
+    """(live path, path inside a snapshot) for every database file."""
+    files = [(database, MAIN_FILE)]
+    if os.path.isdir(shards):
+        for name in sorted(os.listdir(shards)):
+            if name.endswith('.db'):
+                files.append((os.path.join(shards, name), os.path.join(SHARDS_DIR, name)))
+    return files
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+def copy_database(source_path, target_path, pages, sleep, max_restarts=None):
+    """Copy one database with the backup API and report how long it blocked.
+
+    SQLite restarts a stepped backup whenever another connection writes to
+    the source. After max_restarts the copy is finished in a single step
+    instead, which in WAL mode still doesn't block writers.
+    """
+    stats = {'pages': 0, 'steps': 0, 'restarts': 0, 'max_step_seconds': 0.0, 'single_step': pages < 0}
+    last = {'time': time.perf_counter(), 'remaining': None}
+
+    def progress(status, remaining, total):
+        now = time.perf_counter()
+        # Time since the previous step, minus the pause between steps
+        step = now - last['time'] - (sleep if last['remaining'] is not None else 0)
+        stats['max_step_seconds'] = max(stats['max_step_seconds'], step)
+        stats['steps'] += 1
+        if last['remaining'] is not None and remaining > last['remaining']:
+            stats['restarts'] += 1
+            if max_restarts is not None and stats['restarts'] > max_restarts:
+                raise _TooManyRestarts()
+        stats['pages'] = total
+        last['time'] = now
+        last['remaining'] = remaining
+
+    source = sqlite3.connect(source_path)
+    target = sqlite3.connect(target_path)
+    try:
+        stats['journal_mode'] = source.execute('PRAGMA journal_mode').fetchone()[0]
+        started = time.perf_counter()
+        try:
+            source.backup(target, pages=pages, progress=progress, sleep=sleep)
+        except _TooManyRestarts:
+            stats['single_step'] = True
+            last['time'] = time.perf_counter()
+            last['remaining'] = None
+            source.backup(target, pages=-1, progress=progress)
+        stats['seconds'] = time.perf_counter() - started
+        page_size = target.execute('PRAGMA page_size').fetchone()[0]
+        stats['bytes'] = stats['pages'] * page_size
+    finally:
+        target.close()
+        source.close()
+
+    return stats
+
+
+def check_integrity(path):
+    conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    try:
+        result = conn.execute('PRAGMA integrity_check').fetchone()[0]
+    finally:
+        conn.close()
+    if result != 'ok':
+        raise BackupError(f'Integrity check failed for {path}: {result}')
+
+
+def list_snapshots(backups):
+    if not os.path.isdir(backups):
+        return []
+    return sorted(
+        name for name in os.listdir(backups)
+        if not name.endswith('.partial') and os.path.isfile(os.path.join(backups, name, MAIN_FILE))
+    )
+
+
+def backup():
+    database, backups, shards = _paths()
+    pages = app.config['BACKUP_PAGES_PER_STEP']
+    sleep = app.config['BACKUP_STEP_SLEEP']
+
+    name = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+    snapshot = os.path.join(backups, name)
+    partial = snapshot + '.partial'
+    os.makedirs(os.path.join(partial, SHARDS_DIR), exist_ok=True)
+
+    report = {'snapshot': name, 'files': {}}
+    try:
+        for live, relative in _databases(database, shards):
+            target = os.path.join(partial, relative)
+            report['files'][relative] = copy_database(
+                live, target, pages, sleep, app.config['BACKUP_MAX_RESTARTS']
+            )
+            check_integrity(target)
+        os.rename(partial, snapshot)
+    except Exception:
+        shutil.rmtree(partial, ignore_errors=True)
+        raise
+
+    # Retention: keep only the newest snapshots
+    removed = []
+    for old in list_snapshots(backups)[:-app.config['BACKUP_RETENTION']]:
+        shutil.rmtree(os.path.join(backups, old))
+        removed.append(old)
+
+    files = report['files'].values()
+    report['bytes'] = sum(f['bytes'] for f in files)
+    report['seconds'] = sum(f['seconds'] for f in files)
+    report['max_step_seconds'] = max(f['max_step_seconds'] for f in files)
+    report['removed'] = removed
+    return report
+
+
+def restore(name):
+    database, backups, shards = _paths()
+    snapshot = os.path.join(backups, name)
+    if not os.path.isfile(os.path.join(snapshot, MAIN_FILE)):
+        raise BackupError(f'No snapshot named {name} in {backups}')
+
+    files = [(database, MAIN_FILE)]
+    snapshot_shards = os.path.join(snapshot, SHARDS_DIR)
+    if os.path.isdir(snapshot_shards):
+        os.makedirs(shards, exist_ok=True)
+        for shard in sorted(os.listdir(snapshot_shards)):
+            files.append((os.path.join(shards, shard), os.path.join(SHARDS_DIR, shard)))
+
+    # Check everything before overwriting anything
+    for _, relative in files:
+        check_integrity(os.path.join(snapshot, relative))
+
+    report = {'snapshot': name, 'files': {}, 'moved_aside': []}
+    for live, relative in files:
+        # One step: the live database is locked until the restore finishes
+        report['files'][relative] = copy_database(os.path.join(snapshot, relative), live, -1, 0)
+
+    # Shards created after the snapshot belong to users the restored database
+    # no longer has, so they must not stay where a new user could reach them
+    restored = {os.path.basename(relative) for _, relative in files[1:]}
+    if os.path.isdir(shards):
+        aside = os.path.join(backups, f"displaced-{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}")
+        for shard in sorted(os.listdir(shards)):
+            if shard.endswith('.db') and shard not in restored:
+                os.makedirs(aside, exist_ok=True)
+                for suffix in ('', '-wal', '-shm', '-journal'):
+                    if os.path.exists(os.path.join(shards, shard + suffix)):
+                        shutil.move(os.path.join(shards, shard + suffix), os.path.join(aside, shard + suffix))
+                report['moved_aside'].append(shard)
+        if report['moved_aside']:
+            report['displaced_directory'] = aside
+
+    report['bytes'] = sum(f['bytes'] for f in report['files'].values())
+    report['seconds'] = sum(f['seconds'] for f in report['files'].values())
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Online backup and restore of the budget database')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('backup', help='take a snapshot of the live database')
+    commands.add_parser('list', help='list snapshots')
+    restore_parser = commands.add_parser('restore', help='restore a snapshot')
+    restore_parser.add_argument('snapshot')
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == 'list':
+            _, backups, _ = _paths()
+            report = {'snapshots': list_snapshots(backups)}
+            if not args.json:
+                print('\n'.join(report['snapshots']) or 'No snapshots yet.')
+        elif args.command == 'backup':
+            report = backup()
+            if not args.json:
+                print(f"Snapshot {report['snapshot']}: {report['bytes']} bytes in {report['seconds']:.3f}s, "
+                      f"longest block {report['max_step_seconds'] * 1000:.1f}ms")
+                for relative, stats in report['files'].items():
+                    print(f"  {relative}: {stats['bytes']} bytes, {stats['steps']} steps, "
+                          f"{stats['restarts']} restarts{' (finished in one step)' if stats['single_step'] else ''}, "
+                          f"longest block {stats['max_step_seconds'] * 1000:.1f}ms ({stats['journal_mode']} mode)")
+                if report['removed']:
+                    print(f"Removed old snapshots: {', '.join(report['removed'])}")
+        else:
+            report = restore(args.snapshot)
+            if not args.json:
+                print(f"Restored {report['snapshot']}: {report['bytes']} bytes in {report['seconds']:.3f}s")
+                if report['moved_aside']:
+                    print(f"Moved {len(report['moved_aside'])} shards that are not in the snapshot "
+                          f"to {report['displaced_directory']}")
+                print('Restart the app so it drops its cached shard map.')
+    except BackupError as e:
+        sys.exit(str(e))
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
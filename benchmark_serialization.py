@@ -0,0 +1,157 @@
+"""
+Benchmark the list endpoints' serialization paths.
+
+Seeds a scratch database with one user's transactions and budgets, then times
+the ORM path (load objects, call to_dict()) against the column projection
+path in projections.py, and measures the peak memory of each with
+tracemalloc. Results are scaled to per 10k rows.
+
+Usage:
+    python benchmark_serialization.py --rows 50000 --repeat 5
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from flask import Flask
+from models import db, User, Category, Transaction, Budget
+from config import Config
+from projections import transaction_dicts, budget_dicts
+
+PER_ROWS = 10000
+
+
+def orm_transactions(user_id):
+    transactions = Transaction.query.filter_by(user_id=user_id).order_by(Transaction.date.desc()).all()
+    return [t.to_dict() for t in transactions]
+
+
+def orm_budgets(user_id, month, year):
+    budgets = Budget.query.filter_by(
+        month=month,
+        year=year
+    ).join(Category).filter(Category.user_id == user_id).all()
+    return [b.to_dict() for b in budgets]
+
+
+def seed(rows, categories):
+    user = User(username='benchmark', email='benchmark@example.com')
+    user.set_password('benchmark')
+    db.session.add(user)
+    db.session.flush()
+
+    category_ids = []
+    for i in range(categories):
+        category = Category(name=f'Category {i}', user_id=user.id)
+        db.session.add(category)
+        db.session.flush()
+        category_ids.append(category.id)
+
+    rng = random.Random(1)
+    today = date.today()
+    db.session.execute(db.insert(Transaction), [
+        {
+            'description': f'Purchase {i}',
+            'amount': round(rng.uniform(1, 500), 2),
+            'date': today - timedelta(days=rng.randrange(730)),
+            'transaction_type': 'expense',
+            'category_id': rng.choice(category_ids),
+            'notes': None,
+            'user_id': user.id
+        }
+        for i in range(rows)
+    ])
+    db.session.execute(db.insert(Budget), [
+        {'category_id': category_id, 'amount': 100.0, 'month': today.month, 'year': today.year, 'user_id': user.id}
+        for category_id in category_ids
+    ])
+    db.session.commit()
+    return user.id
+
+
+def measure(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        db.session.expunge_all()
+        started = time.perf_counter()
+        json.dumps(fn())
+        times.append(time.perf_counter() - started)
+
+    db.session.expunge_all()
+    tracemalloc.start()
+    result = fn()
+    json.dumps(result)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return statistics.median(times), peak, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare ORM and column projection serialization')
+    parser.add_argument('--rows', type=int, default=PER_ROWS, help='transactions to seed')
+    parser.add_argument('--categories', type=int, default=200, help='categories (and budgets) to seed')
+    parser.add_argument('--repeat', type=int, default=5, help='timed runs per path; the median is reported')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='budget-bench-')
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(workdir, 'benchmark.db')}"
+    db.init_app(app)
+
+    today = date.today()
+    cases = {
+        'transactions': (args.rows, orm_transactions, transaction_dicts),
+        'budgets': (
+            args.categories,
+            lambda user_id: orm_budgets(user_id, today.month, today.year),
+            lambda user_id: budget_dicts(user_id, today.month, today.year)
+        )
+    }
+
+    report = {'rows': args.rows, 'categories': args.categories, 'per_rows': PER_ROWS, 'results': {}}
+    try:
+        with app.app_context():
+            db.create_all()
+            user_id = seed(args.rows, args.categories)
+
+            for name, (rows, orm_path, lean_path) in cases.items():
+                orm_seconds, orm_peak, orm_result = measure(lambda: orm_path(user_id), args.repeat)
+                lean_seconds, lean_peak, lean_result = measure(lambda: lean_path(user_id), args.repeat)
+                if sorted(orm_result, key=lambda d: d['id']) != sorted(lean_result, key=lambda d: d['id']):
+                    raise SystemExit(f'{name}: the two paths returned different data')
+
+                scale = PER_ROWS / rows
+                report['results'][name] = {
+                    'rows': rows,
+                    'orm_ms_per_10k': round(orm_seconds * scale * 1000, 1),
+                    'lean_ms_per_10k': round(lean_seconds * scale * 1000, 1),
+                    'orm_peak_kb_per_10k': round(orm_peak * scale / 1024),
+                    'lean_peak_kb_per_10k': round(lean_peak * scale / 1024),
+                    'speedup': round(orm_seconds / lean_seconds, 2),
+                    'memory_saved': round(1 - lean_peak / orm_peak, 3)
+                }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    for name, r in report['results'].items():
+        print(f"{name} ({r['rows']} rows), per 10k rows:")
+        print(f"  ORM + to_dict():    {r['orm_ms_per_10k']:>8} ms  {r['orm_peak_kb_per_10k']:>8} KB peak")
+        print(f"  column projection:  {r['lean_ms_per_10k']:>8} ms  {r['lean_peak_kb_per_10k']:>8} KB peak")
+        print(f"  {r['speedup']}x faster, {r['memory_saved']:.0%} less memory")
+
+
+if __name__ == '__main__':
+    main()
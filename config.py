@@ -2,5 +2,70 @@ import os
 
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///budget.db'
-    SQLALCHEMY_TRACK_MODIFICATIONS = False
\ No newline at end of file
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///budget.db'
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Per-user sharded storage (see sharding.py)
+    SHARDED_STORAGE = os.environ.get('SHARDED_STORAGE', '').lower() in ('1', 'true', 'yes')
+    SHARD_DIRECTORY = os.environ.get('SHARD_DIRECTORY')  # defaults to instance/shards
+    SHARD_MAX_OPEN_ENGINES = int(os.environ.get('SHARD_MAX_OPEN_ENGINES', 64))
+    SHARD_POOL_SIZE = int(os.environ.get('SHARD_POOL_SIZE', 5))
+
+    # Password hashing, in werkzeug's "<method>:<params>" form. Existing hashes
+    # are upgraded to these settings the next time the user logs in.
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD') or 'scrypt:32768:8:1'
+    PASSWORD_HASH_SALT_LENGTH = int(os.environ.get('PASSWORD_HASH_SALT_LENGTH', 16))
+
+    # Login protection (see login_security.py). Logins beyond the verify
+    # workers (plus MAX_PENDING) get a 503 instead of waiting on a request
+    # thread. Set LOGIN_REQUEST_THREADS to the server's request threads per
+    # process (gunicorn --threads) to keep at least half of them free.
+    LOGIN_VERIFY_WORKERS = int(os.environ.get('LOGIN_VERIFY_WORKERS', 2))
+    LOGIN_VERIFY_MAX_PENDING = int(os.environ.get('LOGIN_VERIFY_MAX_PENDING', 0))
+    LOGIN_VERIFY_TIMEOUT = float(os.environ.get('LOGIN_VERIFY_TIMEOUT', 5))
+    LOGIN_REQUEST_THREADS = int(os.environ.get('LOGIN_REQUEST_THREADS', 0)) or None
+    LOGIN_ATTEMPT_WINDOW = int(os.environ.get('LOGIN_ATTEMPT_WINDOW', 300))
+    LOGIN_MAX_ATTEMPTS_PER_USERNAME = int(os.environ.get('LOGIN_MAX_ATTEMPTS_PER_USERNAME', 10))
+    LOGIN_MAX_ATTEMPTS_PER_IP = int(os.environ.get('LOGIN_MAX_ATTEMPTS_PER_IP', 50))
+
+    # Read/write routing for the analytics endpoints (see read_routing.py).
+    # On SQLite the read pool opens the same file with mode=ro; on a server
+    # database set SQLALCHEMY_READ_URI to a replica.
+    READ_ROUTING = os.environ.get('READ_ROUTING', '1').lower() in ('1', 'true', 'yes')
+    SQLALCHEMY_READ_URI = os.environ.get('SQLALCHEMY_READ_URI')
+    READ_POOL_SIZE = int(os.environ.get('READ_POOL_SIZE', 5))
+    READ_YOUR_WRITES_WINDOW = float(os.environ.get('READ_YOUR_WRITES_WINDOW', 5))
+
+    # Admission control (see admission.py): a token bucket per user for each
+    # route class, in requests per second with a burst allowance, and a cap
+    # on analytics requests running at once in each worker process. A budget
+    # page load or budget edit costs 2 analytics requests, as does a dashboard
+    # load, so the defaults allow a couple of edits per second without a 429.
+    ADMISSION_CONTROL = os.environ.get('ADMISSION_CONTROL', '1').lower() in ('1', 'true', 'yes')
+    ANALYTICS_RATE = float(os.environ.get('ANALYTICS_RATE', 5))
+    ANALYTICS_BURST = int(os.environ.get('ANALYTICS_BURST', 20))
+    ANALYTICS_MAX_CONCURRENT = int(os.environ.get('ANALYTICS_MAX_CONCURRENT', 4))
+    CRUD_RATE = float(os.environ.get('CRUD_RATE', 20))
+    CRUD_BURST = int(os.environ.get('CRUD_BURST', 40))
+
+    # Serve the minified, fingerprinted bundles built by `python assets.py`
+    ASSET_PIPELINE = os.environ.get('ASSET_PIPELINE', '').lower() in ('1', 'true', 'yes')
+
+    # Online backups (see backup_database.py)
+    BACKUP_DIRECTORY = os.environ.get('BACKUP_DIRECTORY')  # defaults to instance/backups
+    BACKUP_RETENTION = int(os.environ.get('BACKUP_RETENTION', 7))
+    BACKUP_PAGES_PER_STEP = int(os.environ.get('BACKUP_PAGES_PER_STEP', 256))
+    BACKUP_STEP_SLEEP = float(os.environ.get('BACKUP_STEP_SLEEP', 0.005))
+    BACKUP_MAX_RESTARTS = int(os.environ.get('BACKUP_MAX_RESTARTS', 3))
+
+    # Transactions older than this many months are moved to the archive by
+    # archive_ledger.py (see archive.py)
+    ARCHIVE_AFTER_MONTHS = int(os.environ.get('ARCHIVE_AFTER_MONTHS', 24))
+
+    # Complete months of history the month-end forecast is fitted on
+    FORECAST_HISTORY_MONTHS = int(os.environ.get('FORECAST_HISTORY_MONTHS', 6))
+
+    # Default budget alert thresholds, as percentages of the monthly budget
+    BUDGET_ALERT_THRESHOLDS = [
+        int(p) for p in os.environ.get('BUDGET_ALERT_THRESHOLDS', '80,100').split(',') if p.strip()
+    ]
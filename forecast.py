@@ -0,0 +1,169 @@
+"""
+Month-end spending forecasts.
+
+For each user we keep a small fitted state in forecast_state. It holds the
+cumulative daily spending of the last FORECAST_HISTORY_MONTHS complete months
+per category, and this month's spending so far. From that the forecast is
+spent so far plus the average amount that was still to come after the same
+day in past months. The state is fitted once a month with NumPy, and the
+transaction write routes keep it current with each change, so a forecast never
+has to scan the ledger.
+"""
+import calendar
+import json
+from datetime import date, datetime, timezone
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import func
+
+from archive import month_range, archived_through
+from models import db, Transaction, ArchivedTransaction, ForecastState
+
+DAYS = 31
+UNCATEGORIZED = 'none'
+
+
+def _month_index(year, month):
+    return year * 12 + month - 1
+
+
+def category_key(category_id):
+    return UNCATEGORIZED if category_id is None else str(category_id)
+
+
+def _daily_amounts(user_id, start, end):
+    """(category_id, date, total) rows of expenses, live and archived."""
+    models = [Transaction]
+    through = archived_through(user_id)
+    if through is not None and through >= start:
+        models.append(ArchivedTransaction)
+
+    rows = []
+    for model in models:
+        rows += db.session.query(model.category_id, model.date, func.sum(model.amount)).filter(
+            model.user_id == user_id,
+            model.transaction_type == 'expense',
+            model.date >= start,
+            model.date < end
+        ).group_by(model.category_id, model.date).all()
+    return rows
+
+
+def fit(user_id, today):
+    """Fit the forecast state from the ledger, for the month containing today."""
+    current = _month_index(today.year, today.month)
+    history = current_app.config['FORECAST_HISTORY_MONTHS']
+    first = current - history
+    start = date(first // 12, first % 12 + 1, 1)
+    end = month_range(today.year, today.month)[1]
+
+    rows = _daily_amounts(user_id, start, end)
+
+    keys = sorted({category_key(category_id) for category_id, _, _ in rows})
+    column = {key: i for i, key in enumerate(keys)}
+    daily = np.zeros((len(keys), history, DAYS))
+    month_to_date = np.zeros(len(keys))
+
+    if rows:
+        categories = np.array([column[category_key(r[0])] for r in rows])
+        months = np.array([_month_index(r[1].year, r[1].month) - first for r in rows])
+        days = np.array([r[1].day - 1 for r in rows])
+        amounts = np.array([r[2] for r in rows], dtype=float)
+
+        past = months < history
+        np.add.at(daily, (categories[past], months[past], days[past]), amounts[past])
+        np.add.at(month_to_date, categories[~past], amounts[~past])
+
+    cumulative = np.cumsum(daily, axis=2)
+
+    return {
+        'month': current,
+        'first_month': first,
+        'cumulative': {key: cumulative[i].round(2).tolist() for key, i in column.items()},
+        'month_to_date': {key: round(float(month_to_date[i]), 2) for key, i in column.items()}
+    }
+
+
+def load_state(user_id, today):
+    """The user's fitted state for today's month, refitting if it is stale."""
+    row = db.session.get(ForecastState, user_id)
+    if row is not None and row.month == _month_index(today.year, today.month):
+        return json.loads(row.state)
+
+    state = fit(user_id, today)
+    if row is None:
+        row = ForecastState(user_id=user_id)
+        db.session.add(row)
+    row.month = state['month']
+    row.state = json.dumps(state)
+    row.updated_at = datetime.now(timezone.utc)
+    db.session.commit()
+    return state
+
+
+def record_transaction_change(user_id, old=None, new=None):
+    """Apply a transaction write to the user's forecast state.
+
+    old and new are (date, amount, transaction_type, category_id) tuples of
+    the transaction before and after the write, or None. Call before commit.
+    """
+    # Flush the write first, so its lock serializes concurrent state updates
+    db.session.flush()
+    row = db.session.get(ForecastState, user_id)
+    if row is None:
+        return
+
+    state = json.loads(row.state)
+    for values, sign in ((old, -1), (new, 1)):
+        if values is None:
+            continue
+        when, amount, transaction_type, category_id = values
+        if transaction_type != 'expense':
+            continue
+
+        key = category_key(category_id)
+        month = _month_index(when.year, when.month)
+        if month == state['month']:
+            state['month_to_date'][key] = round(state['month_to_date'].get(key, 0) + sign * amount, 2)
+        elif state['first_month'] <= month < state['month']:
+            history = state['month'] - state['first_month']
+            cumulative = np.array(state['cumulative'].get(key, np.zeros((history, DAYS))))
+            cumulative[month - state['first_month'], when.day - 1:] += sign * amount
+            state['cumulative'][key] = cumulative.round(2).tolist()
+
+    row.state = json.dumps(state)
+    row.updated_at = datetime.now(timezone.utc)
+
+
+def invalidate(user_id):
+    """Drop the user's state so it is refitted on the next forecast. Call before commit."""
+    db.session.execute(
+        db.delete(ForecastState).where(ForecastState.user_id == user_id),
+        execution_options={'synchronize_session': False}
+    )
+
+
+def project(state, category_keys, today):
+    """Spent so far and projected month-end total for a group of categories."""
+    history = state['month'] - state['first_month']
+    cumulative = np.zeros((history, DAYS))
+    spent = 0.0
+    for key in category_keys:
+        if key in state['cumulative']:
+            cumulative += np.array(state['cumulative'][key])
+        spent += state['month_to_date'].get(key, 0)
+
+    days_in_month = calendar.monthrange(today.year, today.month)[1]
+    totals = cumulative[:, -1]
+    active = totals > 0
+
+    if active.any():
+        # Average spending still to come after today in past months
+        remaining = (totals[active] - cumulative[active, today.day - 1]).mean()
+        forecast = spent + remaining
+    else:
+        # No history, so carry on at this month's pace
+        forecast = spent / today.day * days_in_month
+
+    return round(spent, 2), round(float(forecast), 2)
@@ -0,0 +1,401 @@
+"""
+Multi-user load test against a local server.
+
+Starts the app under gunicorn with several workers on a scratch database,
+registers simulated users through /register, then has every user replay a
+realistic mix of dashboard loads, budget edits and transaction writes
+concurrently with asyncio. Writes a JSON report with throughput, p50/p95/p99
+latency and error rate per route, plus the number of SQLite lock timeouts the
+server logged. Reports from different runs can be compared with --compare.
+
+Needs aiohttp, and gunicorn unless --url points at a server that is already
+running:
+    pip install aiohttp gunicorn
+
+Usage:
+    python load_test.py --users 200 --duration 60 --workers 4 --output report.json
+    python load_test.py --users 200 --compare report.json --output report2.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+# Relative share of each action in the replayed traffic
+SCENARIO_MIX = {
+    'dashboard': 30,
+    'budget_page': 15,
+    'budget_edit': 10,
+    'create_transaction': 25,
+    'edit_transaction': 10,
+    'delete_transaction': 5,
+    'forecast': 5
+}
+
+LOCK_TIMEOUT_PATTERN = re.compile(r'^\S*OperationalError.*database is locked', re.MULTILINE)
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = {}  # route -> [seconds]
+        self.statuses = {}   # route -> {status: count}
+
+    def record(self, route, status, seconds):
+        self.latencies.setdefault(route, []).append(seconds)
+        counts = self.statuses.setdefault(route, {})
+        counts[status] = counts.get(status, 0) + 1
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+class Client:
+    """One simulated user with their own session cookie."""
+
+    def __init__(self, http, base_url, stats, index, rng):
+        self.http = http
+        self.base_url = base_url
+        self.stats = stats
+        self.index = index
+        self.rng = rng
+        self.categories = []
+        self.transactions = []
+        self.seq = 0  # change log position, as the dashboard's store keeps it
+
+    async def request(self, method, path, route=None, **kwargs):
+        route = f'{method} {route or path}'
+        started = time.perf_counter()
+        try:
+            async with self.http.request(method, self.base_url + path, **kwargs) as response:
+                body = await response.read()
+                status = response.status
+        except Exception as e:
+            self.stats.record(route, type(e).__name__, time.perf_counter() - started)
+            return None, None
+        self.stats.record(route, status, time.perf_counter() - started)
+
+        if status < 400 and response.content_type == 'application/json':
+            return status, json.loads(body)
+        return status, None
+
+    async def register(self, run_id):
+        name = f'load{run_id}_{self.index}'
+        status, _ = await self.request('POST', '/register', json={
+            'username': name,
+            'email': f'{name}@example.com',
+            'password': 'load-test-password'
+        })
+        return status == 201
+
+    async def seed(self, transactions):
+        for name in ('Groceries', 'Rent', 'Transport', 'Fun'):
+            _, category = await self.request('POST', '/api/categories', json={'name': name})
+            if category:
+                self.categories.append(category['id'])
+                _, sub = await self.request('POST', '/api/categories', json={
+                    'name': f'{name} extras', 'parent_id': category['id']
+                })
+                if sub:
+                    self.categories.append(sub['id'])
+        for _ in range(transactions):
+            await self.create_transaction(days_back=120)
+
+    def transaction_body(self, days_back=30):
+        day = date.today() - timedelta(days=self.rng.randint(0, days_back))
+        return {
+            'description': 'Load test purchase',
+            'amount': round(self.rng.uniform(1, 200), 2),
+            'date': day.isoformat(),
+            'transaction_type': 'expense',
+            'category_id': self.rng.choice(self.categories) if self.categories else None,
+            'notes': None
+        }
+
+    async def create_transaction(self, days_back=30):
+        _, transaction = await self.request('POST', '/api/transactions', json=self.transaction_body(days_back))
+        if transaction:
+            self.transactions.append(transaction['id'])
+
+    async def sync(self):
+        # Only the delta since the last sync, like syncChanges() in the dashboard
+        _, changes = await self.request('GET', f'/api/changes?since={self.seq}', route='/api/changes')
+        if changes:
+            self.seq = changes['seq']
+
+    async def dashboard(self):
+        await self.request('GET', '/')
+        _, changes = await self.request('GET', '/api/changes')
+        if changes:
+            self.seq = changes['seq']
+        await self.request('GET', '/api/categories')
+        await self.request('GET', '/api/categories?type=income', route='/api/categories')
+        await self.request('GET', '/api/transactions')
+        await self.request('GET', '/api/budgets')
+        await self.request('GET', '/api/category-spending')
+        await self.request('GET', '/api/spending-comparison')
+
+    async def budget_page(self):
+        today = date.today()
+        for category_type in ('expense', 'income'):
+            await self.request(
+                'GET', f'/api/budget-overview?month={today.month}&year={today.year}&type={category_type}',
+                route='/api/budget-overview'
+            )
+
+    async def budget_edit(self):
+        if not self.categories:
+            return
+        today = date.today()
+        await self.request('POST', '/api/budgets', json={
+            'category_id': self.rng.choice(self.categories),
+            'amount': round(self.rng.uniform(50, 800), 2),
+            'month': today.month,
+            'year': today.year
+        })
+        await self.budget_page()
+
+    async def edit_transaction(self):
+        if not self.transactions:
+            return await self.create_transaction()
+        transaction_id = self.rng.choice(self.transactions)
+        await self.request(
+            'PUT', f'/api/transactions/{transaction_id}', route='/api/transactions/<id>',
+            json=self.transaction_body()
+        )
+        await self.sync()
+
+    async def delete_transaction(self):
+        if not self.transactions:
+            return
+        transaction_id = self.transactions.pop(self.rng.randrange(len(self.transactions)))
+        await self.request('DELETE', f'/api/transactions/{transaction_id}', route='/api/transactions/<id>')
+
+    async def forecast(self):
+        await self.request('GET', '/api/spending-forecast')
+
+    async def run(self, deadline, think_time):
+        actions = list(SCENARIO_MIX)
+        weights = list(SCENARIO_MIX.values())
+        while time.monotonic() < deadline:
+            action = self.rng.choices(actions, weights)[0]
+            await getattr(self, action)()
+            await asyncio.sleep(self.rng.expovariate(1 / think_time) if think_time else 0)
+
+
+def build_report(stats, args, seconds, lock_timeouts):
+    routes = {}
+    total = errors = rate_limited = 0
+    for route, latencies in sorted(stats.latencies.items()):
+        statuses = stats.statuses[route]
+        failed = sum(n for status, n in statuses.items() if not isinstance(status, int) or status >= 400)
+        total += len(latencies)
+        errors += failed
+        rate_limited += statuses.get(429, 0)
+        routes[route] = {
+            'requests': len(latencies),
+            'throughput': round(len(latencies) / seconds, 2),
+            'errors': failed,
+            'error_rate': round(failed / len(latencies), 4),
+            'rate_limited': statuses.get(429, 0),
+            'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+            'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+            'max_ms': round(max(latencies) * 1000, 2),
+            'statuses': {str(status): n for status, n in sorted(statuses.items(), key=str)}
+        }
+
+    all_latencies = [s for latencies in stats.latencies.values() for s in latencies]
+    return {
+        'started_at': datetime.now().isoformat(timespec='seconds'),
+        'config': {
+            'users': args.users,
+            'duration': args.duration,
+            'workers': args.workers,
+            'threads': args.threads,
+            'think_time': args.think_time,
+            'seed_transactions': args.seed_transactions,
+            'url': args.url,
+            'mix': SCENARIO_MIX
+        },
+        'totals': {
+            'requests': total,
+            'seconds': round(seconds, 2),
+            'throughput': round(total / seconds, 2) if seconds else 0,
+            'errors': errors,
+            'error_rate': round(errors / total, 4) if total else 0,
+            'rate_limited': rate_limited,
+            'p50_ms': round(percentile(all_latencies, 50) * 1000, 2) if all_latencies else None,
+            'p95_ms': round(percentile(all_latencies, 95) * 1000, 2) if all_latencies else None,
+            'p99_ms': round(percentile(all_latencies, 99) * 1000, 2) if all_latencies else None,
+            'lock_timeouts': lock_timeouts
+        },
+        'routes': routes
+    }
+
+
+def print_report(report, baseline=None):
+    def delta(value, old):
+        if old in (None, 0) or value is None:
+            return ''
+        return f' ({(value - old) / old * 100:+.0f}%)'
+
+    totals = report['totals']
+    old_totals = baseline['totals'] if baseline else {}
+    print(f"\n{totals['requests']} requests in {totals['seconds']}s: "
+          f"{totals['throughput']} req/s{delta(totals['throughput'], old_totals.get('throughput'))}, "
+          f"p95 {totals['p95_ms']}ms{delta(totals['p95_ms'], old_totals.get('p95_ms'))}, "
+          f"errors {totals['error_rate']:.2%} ({totals['rate_limited']} rate limited), lock timeouts {totals['lock_timeouts']}")
+
+    print(f"\n{'route':<40} {'req':>7} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'err':>7}")
+    for route, r in report['routes'].items():
+        old = (baseline or {}).get('routes', {}).get(route, {})
+        print(f"{route:<40} {r['requests']:>7} {r['throughput']:>8} {r['p50_ms']:>8} "
+              f"{r['p95_ms']:>8} {r['p99_ms']:>8} {r['error_rate']:>7.2%}{delta(r['p95_ms'], old.get('p95_ms'))}")
+
+
+def start_server(args, workdir):
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'load_test.db')}")
+    here = os.path.dirname(os.path.abspath(__file__))
+
+    # Create the schema once, so the workers don't race to do it
+    subprocess.run([sys.executable, '-c', 'import app'], cwd=here, env=env, check=True)
+
+    log = open(os.path.join(workdir, 'server.log'), 'w+')
+    server = subprocess.Popen([
+        sys.executable, '-m', 'gunicorn',
+        '--workers', str(args.workers),
+        '--threads', str(args.threads),
+        '--bind', f'127.0.0.1:{args.port}',
+        'app:app'
+    ], cwd=here, env=env, stdout=log, stderr=subprocess.STDOUT)
+    return server, log
+
+
+async def wait_until_ready(base_url, timeout=30):
+    import aiohttp
+
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as http:
+        while time.monotonic() < deadline:
+            try:
+                async with http.get(base_url + '/login') as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f'Server at {base_url} did not come up within {timeout}s')
+
+
+async def run_load(args, base_url):
+    import aiohttp
+
+    await wait_until_ready(base_url)
+
+    stats = Stats()
+    rng = random.Random(args.seed)
+    run_id = f'{int(time.time())}{rng.randrange(1000)}'
+    connector = aiohttp.TCPConnector(limit=0)
+    timeout = aiohttp.ClientTimeout(total=args.request_timeout)
+
+    sessions = [
+        aiohttp.ClientSession(
+            connector=connector, connector_owner=False, timeout=timeout,
+            cookie_jar=aiohttp.CookieJar(unsafe=True)
+        )
+        for _ in range(args.users)
+    ]
+    clients = [
+        Client(http, base_url, stats, i, random.Random(rng.random()))
+        for i, http in enumerate(sessions)
+    ]
+
+    try:
+        print(f'Registering and seeding {args.users} users...')
+        registered = await asyncio.gather(*(client.register(run_id) for client in clients))
+        clients = [client for client, ok in zip(clients, registered) if ok]
+        await asyncio.gather(*(client.seed(args.seed_transactions) for client in clients))
+
+        # Only measure the replayed traffic, not the seeding
+        stats.latencies.clear()
+        stats.statuses.clear()
+
+        print(f'Running {len(clients)} users for {args.duration}s...')
+        started = time.monotonic()
+        deadline = started + args.duration
+        await asyncio.gather(*(client.run(deadline, args.think_time) for client in clients))
+        return stats, time.monotonic() - started
+    finally:
+        for http in sessions:
+            await http.close()
+        await connector.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Concurrent multi-user load test')
+    parser.add_argument('--users', type=int, default=100, help='simulated users')
+    parser.add_argument('--duration', type=float, default=30, help='seconds of traffic after seeding')
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn worker processes')
+    parser.add_argument('--threads', type=int, default=4, help='threads per gunicorn worker')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--url', help='test a server that is already running instead of starting one')
+    parser.add_argument('--think-time', type=float, default=0.5, help='mean pause between actions, in seconds')
+    parser.add_argument('--seed-transactions', type=int, default=20, help='transactions created per user before the run')
+    parser.add_argument('--request-timeout', type=float, default=30)
+    parser.add_argument('--seed', type=int, default=1, help='random seed, for repeatable runs')
+    parser.add_argument('--output', help='write the JSON report here')
+    parser.add_argument('--compare', help='earlier JSON report to compare against')
+    args = parser.parse_args(argv)
+
+    try:
+        import aiohttp  # noqa: F401
+    except ImportError:
+        sys.exit('The load test needs aiohttp: pip install aiohttp gunicorn')
+
+    server = log = None
+    workdir = tempfile.mkdtemp(prefix='budget-load-')
+    base_url = args.url.rstrip('/') if args.url else f'http://127.0.0.1:{args.port}'
+
+    try:
+        if not args.url:
+            server, log = start_server(args, workdir)
+        stats, seconds = asyncio.run(run_load(args, base_url))
+    finally:
+        lock_timeouts = None
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+            log.seek(0)
+            lock_timeouts = len(LOCK_TIMEOUT_PATTERN.findall(log.read()))
+            log.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = build_report(stats, args, seconds, lock_timeouts)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'\nReport written to {args.output}')
+    else:
+        print(json.dumps(report['totals'], indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Login protection: a bounded pool for password verification and an in-memory
+attempt throttle.
+
+Password hashes are deliberately slow, so verifying them on the request
+thread lets a burst of logins occupy every worker. PasswordVerifier runs the
+checks on a small fixed pool and turns a login away with VerifierBusy as soon
+as every verify worker is taken, rather than parking its request thread in a
+queue. At most that many request threads are ever busy hashing, and never
+more than half of the process's request threads when that number is known.
+Upgrading a hash made with older parameters goes through the same pool and
+is simply skipped when no worker is free.
+AttemptThrottle counts attempts per key (username, IP address) in a fixed
+window so repeated attempts are rejected before any hashing is done.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class VerifierBusy(Exception):
+    pass
+
+
+class PasswordVerifier:
+    def __init__(self, workers=2, max_pending=0, timeout=5, request_threads=None,
+                 method='scrypt', salt_length=16):
+        self.timeout = timeout
+        self.method = method
+        self.salt_length = salt_length
+
+        # Werkzeug expands short method names ("scrypt" becomes
+        # "scrypt:32768:8:1"), so take the stored form from a real hash
+        self._method_prefix = generate_password_hash('', method=method, salt_length=salt_length).split('$')[0]
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-verify')
+
+        # Every admitted login holds a request thread until its hash is done
+        slots = workers + max_pending
+        if request_threads:
+            slots = min(slots, max(1, request_threads // 2))
+        self._slots = threading.BoundedSemaphore(slots)
+
+    def _run(self, fn, *args, **kwargs):
+        if not self._slots.acquire(blocking=False):
+            raise VerifierBusy()
+
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            raise VerifierBusy()
+
+    def verify(self, password_hash, password):
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        # Werkzeug hashes look like "<method>$<salt>$<hash>"
+        method, _, rest = password_hash.partition('$')
+        salt = rest.partition('$')[0]
+        return method != self._method_prefix or len(salt) != self.salt_length
+
+    def rehash(self, password):
+        """A new hash with the current parameters, or None if no worker is free."""
+        try:
+            return self._run(generate_password_hash, password, method=self.method, salt_length=self.salt_length)
+        except VerifierBusy:
+            return None
+
+
+class AttemptThrottle:
+    def __init__(self, window=300):
+        self.window = window
+        self._attempts = {}  # key -> [count, window expiry]
+        self._lock = threading.Lock()
+        self._next_purge = time.monotonic() + window
+
+    def retry_after(self, key, limit):
+        """Seconds until key may try again, or 0 if it is under limit."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._attempts.get(key)
+            if entry is None or entry[1] <= now or entry[0] < limit:
+                return 0
+            return int(entry[1] - now) + 1
+
+    def hit(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._attempts.get(key)
+            if entry is None or entry[1] <= now:
+                self._attempts[key] = [1, now + self.window]
+            else:
+                entry[0] += 1
+
+            if now >= self._next_purge:
+                self._attempts = {k: v for k, v in self._attempts.items() if v[1] > now}
+                self._next_purge = now + self.window
+
+    def reset(self, key):
+        with self._lock:
+            self._attempts.pop(key, None)
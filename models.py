@@ -1,9 +1,11 @@
+from flask import current_app
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime, timezone
+from read_routing import ReadWriteSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': ReadWriteSession})
 
 class User(UserMixin, db.Model):
     __tablename__ = 'users'
@@ -20,7 +22,11 @@ class User(UserMixin, db.Model):
     budgets = db.relationship('Budget', backref='user', cascade='all, delete-orphan', lazy=True)
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = generate_password_hash(
+            password,
+            method=current_app.config['PASSWORD_HASH_METHOD'],
+            salt_length=current_app.config['PASSWORD_HASH_SALT_LENGTH']
+        )
 
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
@@ -33,6 +39,13 @@ class User(UserMixin, db.Model):
             'created_at': self.created_at.isoformat()
         }
 
+class ShardMap(db.Model):
+    __tablename__ = 'shard_map'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    shard = db.Column(db.String(255), nullable=False)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
 class Category(db.Model):
     __tablename__ = 'categories'
 
@@ -46,14 +59,16 @@ class Category(db.Model):
     transactions = db.relationship('Transaction', backref='category', cascade='all, delete-orphan')
     budgets = db.relationship('Budget', backref='category', cascade='all, delete-orphan')
     
-    def to_dict(self):
-        return {
+    def to_dict(self, include_subcategories=True):
+        data = {
             'id': self.id,
             'name': self.name,
             'parent_id': self.parent_id,
-            'category_type': self.category_type,
-            'subcategories': [sub.to_dict() for sub in self.subcategories]
+            'category_type': self.category_type
         }
+        if include_subcategories:
+            data['subcategories'] = [sub.to_dict() for sub in self.subcategories]
+        return data
 
 class Transaction(db.Model):
     __tablename__ = 'transactions'
@@ -63,10 +78,13 @@ class Transaction(db.Model):
     amount = db.Column(db.Float, nullable=False)
     date = db.Column(db.Date, nullable=False)
     transaction_type = db.Column(db.String(20), nullable=False)
-    category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), nullable=True)
+    category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), nullable=True, index=True)
     notes = db.Column(db.Text, nullable=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+    # Never reuse the id of a transaction that has been archived
+    __table_args__ = {'sqlite_autoincrement': True}
     
     def to_dict(self):
         return {
@@ -80,6 +98,40 @@ class Transaction(db.Model):
             'created_at': self.created_at.isoformat()
         }
 
+class ArchivedTransaction(db.Model):
+    __tablename__ = 'transactions_archive'
+
+    # Ids are kept from the transactions table
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    description = db.Column(db.String(200), nullable=False)
+    amount = db.Column(db.Float, nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    transaction_type = db.Column(db.String(20), nullable=False)
+    category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), nullable=True, index=True)
+    notes = db.Column(db.Text, nullable=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    created_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (db.Index('ix_transactions_archive_user_id_date', 'user_id', 'date'),)
+
+    to_dict = Transaction.to_dict
+
+class CategoryRollup(db.Model):
+    __tablename__ = 'category_rollups'
+
+    # Monthly totals of the archived transactions, per category and type
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    category_id = db.Column(db.Integer, nullable=True)
+    year = db.Column(db.Integer, nullable=False)
+    month = db.Column(db.Integer, nullable=False)
+    transaction_type = db.Column(db.String(20), nullable=False)
+    total = db.Column(db.Float, nullable=False)
+    count = db.Column(db.Integer, nullable=False)
+
+    __table_args__ = (db.Index('ix_category_rollups_user_id_year_month', 'user_id', 'year', 'month'),)
+
 class Budget(db.Model):
     __tablename__ = 'budgets'
 
@@ -101,4 +153,93 @@ class Budget(db.Model):
             'month': self.month,
             'year': self.year,
             'created_at': self.created_at.isoformat()
-        }
\ No newline at end of file
+        }
+
+class ChangeLog(db.Model):
+    __tablename__ = 'change_log'
+
+    # The id doubles as the sequence number clients sync from
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    entity = db.Column(db.String(20), nullable=False)  # 'transaction', 'category' or 'budget'
+    entity_id = db.Column(db.Integer, nullable=False)
+    operation = db.Column(db.String(10), nullable=False)  # 'upsert' or 'delete'
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (db.Index('ix_change_log_user_id_id', 'user_id', 'id'),)
+
+class ForecastState(db.Model):
+    __tablename__ = 'forecast_state'
+
+    # Fitted month-end forecast state for one user (see forecast.py)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    month = db.Column(db.Integer, nullable=False)  # year * 12 + month - 1
+    state = db.Column(db.Text, nullable=False)
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+class AlertThreshold(db.Model):
+    __tablename__ = 'alert_thresholds'
+
+    # Percentages of a category's monthly budget that raise an alert. A
+    # category without rows uses BUDGET_ALERT_THRESHOLDS.
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), nullable=False, index=True)
+    percent = db.Column(db.Integer, nullable=False)
+
+    __table_args__ = (db.UniqueConstraint('category_id', 'percent', name='unique_category_percent'),)
+
+class CategorySpending(db.Model):
+    __tablename__ = 'category_spending'
+
+    # Running expense total for one alert scope and month (see alerts.py). A
+    # top-level category's total includes its subcategories.
+    category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), primary_key=True)
+    year = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    total = db.Column(db.Float, nullable=False)
+
+class Notification(db.Model):
+    __tablename__ = 'notifications'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), nullable=False)
+    month = db.Column(db.Integer, nullable=False)
+    year = db.Column(db.Integer, nullable=False)
+    threshold = db.Column(db.Integer, nullable=False)
+    spent = db.Column(db.Float, nullable=False)
+    budgeted = db.Column(db.Float, nullable=False)
+    message = db.Column(db.String(300), nullable=False)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    acknowledged_at = db.Column(db.DateTime)
+
+    # Each threshold alerts at most once per category and month
+    __table_args__ = (
+        db.UniqueConstraint('category_id', 'year', 'month', 'threshold', name='unique_category_month_threshold'),
+        db.Index('ix_notifications_user_id_acknowledged_at', 'user_id', 'acknowledged_at'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'category_id': self.category_id,
+            'month': self.month,
+            'year': self.year,
+            'threshold': self.threshold,
+            'spent': self.spent,
+            'budgeted': self.budgeted,
+            'message': self.message,
+            'created_at': self.created_at.isoformat(),
+            'acknowledged': self.acknowledged_at is not None
+        }
+
+class ReportCache(db.Model):
+    __tablename__ = 'report_cache'
+
+    # Finished annual reports for closed years (see reports.py)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    year = db.Column(db.Integer, primary_key=True)
+    report = db.Column(db.Text, nullable=False)
+    generated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
@@ -0,0 +1,67 @@
+"""
+Lean read paths for the list endpoints.
+
+Loading full ORM objects means building an instance, its instance state and
+an identity map entry for every row, only to turn each one straight back into
+a dict. These helpers select just the serialized columns as plain rows and
+build the dicts from the tuples. The output matches to_dict() exactly.
+benchmark_serialization.py compares the two paths.
+"""
+import heapq
+from operator import itemgetter
+
+from models import db, Category, Transaction, ArchivedTransaction, Budget
+
+
+def _transaction_select(model, user_id):
+    return db.select(
+        model.id, model.description, model.amount, model.date, model.transaction_type,
+        model.category_id, model.notes, model.created_at
+    ).where(model.user_id == user_id).order_by(model.date.desc())
+
+
+def _transaction_dicts(rows):
+    return [
+        {
+            'id': id,
+            'description': description,
+            'amount': amount,
+            'date': date.isoformat(),
+            'transaction_type': transaction_type,
+            'category_id': category_id,
+            'notes': notes,
+            'created_at': created_at.isoformat()
+        }
+        for id, description, amount, date, transaction_type, category_id, notes, created_at in rows
+    ]
+
+
+def transaction_dicts(user_id):
+    """All of user_id's transactions, live and archived, newest first."""
+    live = _transaction_dicts(db.session.execute(_transaction_select(Transaction, user_id)))
+    archived = _transaction_dicts(db.session.execute(_transaction_select(ArchivedTransaction, user_id)))
+    if not archived:
+        return live
+
+    # Both lists are already sorted by date, so merge rather than re-sort
+    return list(heapq.merge(live, archived, key=itemgetter('date'), reverse=True))
+
+
+def budget_dicts(user_id, month, year):
+    """user_id's budgets for one month."""
+    rows = db.session.execute(
+        db.select(Budget.id, Budget.category_id, Budget.amount, Budget.month, Budget.year, Budget.created_at)
+        .join(Category, Budget.category_id == Category.id)
+        .where(Budget.month == month, Budget.year == year, Category.user_id == user_id)
+    )
+    return [
+        {
+            'id': id,
+            'category_id': category_id,
+            'amount': amount,
+            'month': month,
+            'year': year,
+            'created_at': created_at.isoformat()
+        }
+        for id, category_id, amount, month, year, created_at in rows
+    ]
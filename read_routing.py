@@ -0,0 +1,82 @@
+"""
+Read/write connection routing for the heavy read-only endpoints.
+
+Routes decorated with @read_only run their queries on a separate read engine:
+a pool of mode=ro connections to the same file on SQLite, or the replica in
+SQLALCHEMY_READ_URI on a server database. A user who wrote something within
+READ_YOUR_WRITES_WINDOW seconds keeps reading from the primary so they always
+see their own changes. The last write time is kept in the signed session
+cookie, so this works across worker processes.
+"""
+import time
+from functools import wraps
+
+import sqlalchemy as sa
+from flask import current_app, g, has_app_context, request, session
+
+from sharding import SHARDED_TABLES, ShardedSession
+
+WRITE_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+
+
+class ReadWriteSession(ShardedSession):
+    """Session that sends queries to the read engine inside @read_only routes."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_app_context() and g.get('read_engine') is not None:
+            table = None
+            if mapper is not None:
+                table = sa.inspect(mapper).local_table
+            elif isinstance(clause, sa.Table):
+                table = clause
+
+            # Shards are already one file per user, so they stay on their own engine
+            sharded = 'shard_router' in current_app.extensions
+            if not (sharded and table is not None and table.name in SHARDED_TABLES):
+                return g.read_engine
+
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def read_only(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        engine = current_app.extensions.get('read_engine')
+        window = current_app.config['READ_YOUR_WRITES_WINDOW']
+        if engine is not None and time.time() - session.get('last_write', 0) >= window:
+            g.read_engine = engine
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def _read_uri(app, engine):
+    if app.config.get('SQLALCHEMY_READ_URI'):
+        return app.config['SQLALCHEMY_READ_URI']
+
+    url = engine.url
+    if url.get_backend_name() == 'sqlite' and url.database and url.database != ':memory:':
+        return f'sqlite:///file:{url.database}?mode=ro&uri=true'
+
+    return None
+
+
+def init_read_routing(app, db):
+    uri = _read_uri(app, db.engine)
+    if uri is None:
+        return None
+
+    if db.engine.url.get_backend_name() == 'sqlite':
+        # WAL lets the read connections run alongside a writer
+        with db.engine.connect() as conn:
+            conn.exec_driver_sql('PRAGMA journal_mode=WAL')
+
+    engine = sa.create_engine(uri, pool_size=app.config['READ_POOL_SIZE'])
+    app.extensions['read_engine'] = engine
+
+    @app.after_request
+    def remember_last_write(response):
+        if request.method in WRITE_METHODS and response.status_code < 400:
+            session['last_write'] = time.time()
+        return response
+
+    return engine
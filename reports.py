@@ -0,0 +1,263 @@
+"""
+Annual reports: budget against actual per category per month, yearly totals,
+savings rate and top merchants.
+
+fetch_year() loads everything a year needs in a handful of grouped queries:
+categories, budgets, monthly totals per category (live rows plus the rollups
+of archived months) and spending per description. compute_month() works on
+that plain data only, so batch runs can spread the months over a process
+pool. Reports for closed years are cached in report_cache; the write routes
+call invalidate_reports() for the years they touch.
+"""
+import json
+from collections import defaultdict
+from datetime import MAXYEAR, MINYEAR, date, datetime, timezone
+
+from sqlalchemy import extract, func
+
+from archive import archived_through
+from models import db, Category, Transaction, ArchivedTransaction, Budget, CategoryRollup, ReportCache
+
+TOP_MERCHANTS = 10
+
+# fetch_year() needs the first day of the following year
+FIRST_YEAR, LAST_YEAR = MINYEAR, MAXYEAR - 1
+
+
+def fetch_year(user_id, year):
+    """Everything the report for one year needs, as plain picklable data."""
+    start, end = date(year, 1, 1), date(year + 1, 1, 1)
+
+    categories = db.session.execute(
+        db.select(Category.id, Category.name, Category.parent_id, Category.category_type)
+        .where(Category.user_id == user_id)
+        .order_by(Category.name)
+    ).all()
+
+    budgets = defaultdict(dict)  # month -> {category_id: amount}
+    for category_id, month, amount in db.session.execute(
+        db.select(Budget.category_id, Budget.month, Budget.amount)
+        .where(Budget.user_id == user_id, Budget.year == year)
+    ):
+        budgets[month][category_id] = amount
+
+    totals = defaultdict(lambda: defaultdict(float))  # (month, type) -> {category_id: total}
+    month = extract('month', Transaction.date)
+    for category_id, m, transaction_type, total in db.session.execute(
+        db.select(Transaction.category_id, month, Transaction.transaction_type, func.sum(Transaction.amount))
+        .where(Transaction.user_id == user_id, Transaction.date >= start, Transaction.date < end)
+        .group_by(Transaction.category_id, month, Transaction.transaction_type)
+    ):
+        totals[(int(m), transaction_type)][category_id] += total
+
+    merchant_models = [Transaction]
+    through = archived_through(user_id)
+    if through is not None and through >= start:
+        merchant_models.append(ArchivedTransaction)
+        for category_id, m, transaction_type, total in db.session.execute(
+            db.select(CategoryRollup.category_id, CategoryRollup.month,
+                      CategoryRollup.transaction_type, CategoryRollup.total)
+            .where(CategoryRollup.user_id == user_id, CategoryRollup.year == year)
+        ):
+            totals[(m, transaction_type)][category_id] += total
+
+    merchants = defaultdict(lambda: [0.0, 0])
+    for model in merchant_models:
+        for description, total, count in db.session.execute(
+            db.select(model.description, func.sum(model.amount), func.count())
+            .where(
+                model.user_id == user_id,
+                model.transaction_type == 'expense',
+                model.date >= start,
+                model.date < end
+            )
+            .group_by(model.description)
+        ):
+            merchants[description][0] += total
+            merchants[description][1] += count
+
+    return {
+        'user_id': user_id,
+        'year': year,
+        'categories': [tuple(row) for row in categories],
+        'budgets': {m: dict(b) for m, b in budgets.items()},
+        'totals': {key: dict(t) for key, t in totals.items()},
+        'merchants': {description: tuple(value) for description, value in merchants.items()}
+    }
+
+
+def _category_tree(categories, category_type):
+    """Top-level categories of one type with their subcategories, by name."""
+    subcategories = defaultdict(list)
+    for id, name, parent_id, _ in categories:
+        if parent_id is not None:
+            subcategories[parent_id].append((id, name))
+    return [
+        (id, name, subcategories[id])
+        for id, name, parent_id, type_ in categories
+        if parent_id is None and type_ == category_type
+    ]
+
+
+def _savings_rate(income, expenses):
+    return round((income - expenses) / income, 4) if income else None
+
+
+def compute_month(year_data, month):
+    """Budget against actual for one month, from fetch_year() data."""
+    budgets = year_data['budgets'].get(month, {})
+    expenses = year_data['totals'].get((month, 'expense'), {})
+    income = year_data['totals'].get((month, 'income'), {})
+
+    rows = []
+    for id, name, subcategories in _category_tree(year_data['categories'], 'expense'):
+        sub_rows = []
+        for sub_id, sub_name in subcategories:
+            budgeted = budgets.get(sub_id, 0)
+            actual = round(expenses.get(sub_id, 0), 2)
+            sub_rows.append({
+                'category_id': sub_id,
+                'category_name': sub_name,
+                'budgeted': budgeted,
+                'actual': actual,
+                'difference': round(actual - budgeted, 2)
+            })
+
+        # Like the budget overview, a parent includes its subcategories
+        budgeted = budgets.get(id, 0) + sum(r['budgeted'] for r in sub_rows)
+        actual = round(expenses.get(id, 0) + sum(r['actual'] for r in sub_rows), 2)
+        rows.append({
+            'category_id': id,
+            'category_name': name,
+            'budgeted': budgeted,
+            'actual': actual,
+            'difference': round(actual - budgeted, 2),
+            'subcategories': sub_rows
+        })
+
+    total_income = round(sum(income.values()), 2)
+    total_expenses = round(sum(expenses.values()), 2)
+    return {
+        'month': month,
+        'income': total_income,
+        'expenses': total_expenses,
+        'budgeted': round(sum(r['budgeted'] for r in rows), 2),
+        'uncategorized': round(expenses.get(None, 0), 2),
+        'savings': round(total_income - total_expenses, 2),
+        'savings_rate': _savings_rate(total_income, total_expenses),
+        'categories': rows
+    }
+
+
+def _compute_month_args(args):
+    return compute_month(*args)
+
+
+def assemble_report(year_data, months):
+    """The annual report from fetch_year() data and its twelve computed months."""
+    income = round(sum(m['income'] for m in months), 2)
+    expenses = round(sum(m['expenses'] for m in months), 2)
+
+    categories = {}
+    for m in months:
+        for row in m['categories']:
+            entry = categories.setdefault(row['category_id'], {
+                'category_id': row['category_id'],
+                'category_name': row['category_name'],
+                'budgeted': 0,
+                'actual': 0
+            })
+            entry['budgeted'] += row['budgeted']
+            entry['actual'] += row['actual']
+    for entry in categories.values():
+        entry['budgeted'] = round(entry['budgeted'], 2)
+        entry['actual'] = round(entry['actual'], 2)
+        entry['difference'] = round(entry['actual'] - entry['budgeted'], 2)
+
+    merchants = sorted(year_data['merchants'].items(), key=lambda item: item[1][0], reverse=True)
+    return {
+        'year': year_data['year'],
+        'totals': {
+            'income': income,
+            'expenses': expenses,
+            'budgeted': round(sum(m['budgeted'] for m in months), 2),
+            'savings': round(income - expenses, 2),
+            'savings_rate': _savings_rate(income, expenses)
+        },
+        'categories': list(categories.values()),
+        'months': months,
+        'top_merchants': [
+            {'description': description, 'total': round(total, 2), 'count': count}
+            for description, (total, count) in merchants[:TOP_MERCHANTS]
+        ]
+    }
+
+
+def build_reports(years_data, executor=None):
+    """Reports for several fetch_year() results.
+
+    With an executor (e.g. a ProcessPoolExecutor) the months of every year
+    are computed on it in one batch.
+    """
+    jobs = [(year_data, month) for year_data in years_data for month in range(1, 13)]
+    if executor is None:
+        computed = [compute_month(*job) for job in jobs]
+    else:
+        computed = list(executor.map(_compute_month_args, jobs, chunksize=12))
+
+    return [
+        assemble_report(year_data, computed[i * 12:(i + 1) * 12])
+        for i, year_data in enumerate(years_data)
+    ]
+
+
+def is_closed(year):
+    return year < date.today().year
+
+
+def cached_report(user_id, year):
+    if not is_closed(year):
+        return None
+    row = db.session.get(ReportCache, (user_id, year))
+    return json.loads(row.report) if row is not None else None
+
+
+def store_report(user_id, report):
+    """Cache a report if its year is closed. The caller commits."""
+    if not is_closed(report['year']):
+        return
+    db.session.merge(ReportCache(
+        user_id=user_id,
+        year=report['year'],
+        report=json.dumps(report),
+        generated_at=datetime.now(timezone.utc)
+    ))
+
+
+def annual_reports(user_id, years, executor=None, use_cache=True):
+    """Reports for user_id's years, from the cache where possible. The caller commits."""
+    reports = {}
+    if use_cache:
+        for year in years:
+            report = cached_report(user_id, year)
+            if report is not None:
+                reports[year] = report
+
+    missing = [year for year in years if year not in reports]
+    for report in build_reports([fetch_year(user_id, year) for year in missing], executor):
+        store_report(user_id, report)
+        reports[report['year']] = report
+
+    return [reports[year] for year in years]
+
+
+def invalidate_reports(user_id, years=None):
+    """Drop cached reports for years (all of them if None). Call before commit."""
+    query = db.delete(ReportCache).where(ReportCache.user_id == user_id)
+    if years is not None:
+        # Only closed years are ever cached
+        years = [year for year in years if is_closed(year)]
+        if not years:
+            return
+        query = query.where(ReportCache.year.in_(years))
+    db.session.execute(query, execution_options={'synchronize_session': False})
@@ -0,0 +1,75 @@
+"""
+In-place upgrades for SQLite databases created by older versions.
+
+create_all() only creates missing tables, so table options added later never
+reach an existing database. Transaction ids must not be reused once a row is
+archived, which needs AUTOINCREMENT on the transactions table: without it
+SQLite hands out max(id) + 1, an id the archive may already hold.
+upgrade_transaction_ids() rebuilds the table with AUTOINCREMENT when it lacks
+it and makes sure the id sequence starts above every id in either table.
+"""
+import sqlalchemy as sa
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+TRANSACTIONS = 'transactions'
+ARCHIVE = 'transactions_archive'
+
+
+def has_autoincrement(conn, table=TRANSACTIONS):
+    if conn.dialect.name != 'sqlite':
+        return True
+    sql = conn.exec_driver_sql(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    ).scalar()
+    return sql is not None and 'AUTOINCREMENT' in sql.upper()
+
+
+def _rebuild(conn, table):
+    old = f'{table.name}_before_autoincrement'
+    old_columns = {row[1] for row in conn.exec_driver_sql(f'PRAGMA table_info({table.name})')}
+    columns = ', '.join(c.name for c in table.columns if c.name in old_columns)
+
+    # Index names stay with the renamed table, so drop them first
+    indexes = conn.exec_driver_sql(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+        (table.name,)
+    ).scalars().all()
+    for name in indexes:
+        conn.exec_driver_sql(f'DROP INDEX "{name}"')
+
+    conn.exec_driver_sql(f'ALTER TABLE {table.name} RENAME TO {old}')
+    conn.execute(CreateTable(table))
+    for index in table.indexes:
+        conn.execute(CreateIndex(index))
+    conn.exec_driver_sql(f'INSERT INTO {table.name} ({columns}) SELECT {columns} FROM {old}')
+    conn.exec_driver_sql(f'DROP TABLE {old}')
+
+
+def upgrade_transaction_ids(engine, metadata):
+    """Give the transactions table AUTOINCREMENT and a sequence past every
+    live and archived id. Safe to run on every start."""
+    if engine.url.get_backend_name() != 'sqlite':
+        return
+
+    with engine.begin() as conn:
+        tables = set(sa.inspect(conn).get_table_names())
+        if TRANSACTIONS not in tables:
+            return
+        if not has_autoincrement(conn):
+            _rebuild(conn, metadata.tables[TRANSACTIONS])
+
+        highest = conn.exec_driver_sql(f'SELECT max(id) FROM {TRANSACTIONS}').scalar() or 0
+        if ARCHIVE in tables:
+            highest = max(highest, conn.exec_driver_sql(f'SELECT max(id) FROM {ARCHIVE}').scalar() or 0)
+
+        current = conn.exec_driver_sql(
+            'SELECT seq FROM sqlite_sequence WHERE name = ?', (TRANSACTIONS,)
+        ).scalar()
+        if current is None:
+            conn.exec_driver_sql(
+                'INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)', (TRANSACTIONS, highest)
+            )
+        elif current < highest:
+            conn.exec_driver_sql(
+                'UPDATE sqlite_sequence SET seq = ? WHERE name = ?', (highest, TRANSACTIONS)
+            )
@@ -0,0 +1,186 @@
+"""
+Optional per-user sharded storage.
+
+When SHARDED_STORAGE is enabled, each user's categories, transactions,
+budgets, change log and archive live in their own SQLite file under
+SHARD_DIRECTORY. The main database only keeps the users table and the
+shard_map table that records which file belongs to which user. Shard engines
+are opened on demand and the least recently used ones are disposed once more
+than SHARD_MAX_OPEN_ENGINES are open.
+"""
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql, sqlite
+from flask import current_app, g, has_request_context
+from flask_login import current_user
+from flask_sqlalchemy.session import Session
+
+from schema_upgrades import upgrade_transaction_ids
+
+SHARDED_TABLES = (
+    'categories', 'transactions', 'budgets', 'change_log',
+    'transactions_archive', 'category_rollups', 'forecast_state',
+    'alert_thresholds', 'notifications', 'report_cache', 'category_spending'
+)
+
+# Dialects whose INSERT supports ON CONFLICT DO NOTHING
+_UPSERT_INSERTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+
+class ShardRouter:
+    def __init__(self, global_engine, metadata, directory, max_open_engines=64, pool_size=5):
+        self.global_engine = global_engine
+        self.metadata = metadata
+        self.directory = directory
+        self.max_open_engines = max_open_engines
+        self.pool_size = pool_size
+        self.tables = [metadata.tables[name] for name in SHARDED_TABLES]
+
+        self._shards = {}             # user_id -> shard file name
+        self._engines = OrderedDict() # shard file name -> engine, in LRU order
+        self._initialized = set()
+        self._lock = threading.Lock()  # guards _engines order and eviction
+        self._user_locks = {}          # user_id -> lock held while opening their shard
+
+        os.makedirs(directory, exist_ok=True)
+
+    def shard_for(self, user_id):
+        shard = self._shards.get(user_id)
+        if shard:
+            return shard
+
+        shard_map = self.metadata.tables['shard_map']
+        select = sa.select(shard_map.c.shard).where(shard_map.c.user_id == user_id)
+        with self.global_engine.connect() as conn:
+            shard = conn.execute(select).scalar()
+
+        if shard is None:
+            # Not derived from the user id: ids can be handed out again
+            # after a restore, and must not lead to an old user's file.
+            # Another worker process may claim the user first; then its row
+            # wins and is read back.
+            name = f'{uuid.uuid4().hex}.db'
+            with self.global_engine.begin() as conn:
+                insert = _UPSERT_INSERTS.get(conn.dialect.name)
+                if insert is not None:
+                    conn.execute(
+                        insert(shard_map).values(user_id=user_id, shard=name)
+                        .on_conflict_do_nothing(index_elements=['user_id'])
+                    )
+                else:
+                    conn.execute(sa.insert(shard_map).values(user_id=user_id, shard=name))
+                shard = conn.execute(select).scalar()
+
+        self._shards[user_id] = shard
+        return shard
+
+    def engine_for(self, user_id):
+        # Already open: no lock, so users never wait on each other here
+        shard = self._shards.get(user_id)
+        engine = self._engines.get(shard) if shard else None
+        if engine is not None:
+            # Recency is best effort: skip it rather than wait for the lock
+            if self._lock.acquire(blocking=False):
+                if shard in self._engines:
+                    self._engines.move_to_end(shard)
+                self._lock.release()
+            return engine
+
+        # Opening a shard writes the shard map and may create tables, so only
+        # requests for the same user wait for it
+        with self._user_locks.setdefault(user_id, threading.Lock()):
+            shard = self.shard_for(user_id)
+            engine = self._engines.get(shard)
+            if engine is not None:
+                return engine
+
+            path = os.path.join(self.directory, shard)
+            engine = sa.create_engine(f'sqlite:///{path}', pool_size=self.pool_size)
+            if shard not in self._initialized:
+                self.metadata.create_all(engine, tables=self.tables)
+                upgrade_transaction_ids(engine, self.metadata)
+                self._initialized.add(shard)
+
+            with self._lock:
+                self._engines[shard] = engine
+                evicted = []
+                while len(self._engines) > self.max_open_engines:
+                    evicted.append(self._engines.popitem(last=False)[1])
+
+        for old in evicted:
+            old.dispose()
+        return engine
+
+    def dispose(self):
+        with self._lock:
+            for engine in self._engines.values():
+                engine.dispose()
+            self._engines.clear()
+
+
+class ShardedSession(Session):
+    """Session that sends queries on the per-user tables to the user's shard."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        router = current_app.extensions.get('shard_router') if bind is None else None
+
+        if router is not None:
+            table = None
+            if mapper is not None:
+                table = sa.inspect(mapper).local_table
+            elif isinstance(clause, sa.Table):
+                table = clause
+            elif isinstance(clause, sa.UpdateBase):
+                table = clause.table
+
+            if table is not None and table.name in SHARDED_TABLES:
+                return router.engine_for(_shard_user_id())
+
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _shard_user_id():
+    if 'shard_user_id' in g:
+        return g.shard_user_id
+    if has_request_context() and current_user.is_authenticated:
+        return current_user.id
+    raise RuntimeError('No user to route the sharded query to; use shard_context(user_id)')
+
+
+@contextmanager
+def shard_context(user_id):
+    """Route sharded queries to user_id's shard outside of a logged-in request.
+
+    Primary keys are only unique within a shard, so use a fresh session for
+    each user.
+    """
+    previous = g.pop('shard_user_id', None)
+    g.shard_user_id = user_id
+    try:
+        yield
+    finally:
+        g.pop('shard_user_id', None)
+        if previous is not None:
+            g.shard_user_id = previous
+
+
+def init_sharding(app, db):
+    directory = app.config.get('SHARD_DIRECTORY') or os.path.join(app.instance_path, 'shards')
+    router = ShardRouter(
+        db.engine,
+        db.metadata,
+        directory,
+        max_open_engines=app.config.get('SHARD_MAX_OPEN_ENGINES', 64),
+        pool_size=app.config.get('SHARD_POOL_SIZE', 5)
+    )
+    app.extensions['shard_router'] = router
+
+    # The main database only holds users and the shard map
+    global_tables = [t for t in db.metadata.sorted_tables if t.name not in SHARDED_TABLES]
+    db.metadata.create_all(db.engine, tables=global_tables)
+    return router
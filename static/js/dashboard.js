@@ -0,0 +1,1537 @@
+const API_URL = '/api';
+let categories = [];
+let incomeCategories = [];
+let currentTransactionType = 'expense';
+let currentBudgetMonth = new Date().getMonth() + 1;
+let currentBudgetYear = new Date().getFullYear();
+let currentSection = 'dashboard';
+let allTransactions = [];
+let editingTransactionId = null;
+let originalTransactionData = null;
+
+// GET a JSON endpoint. Rate-limited responses (429) are retried after the
+// server's Retry-After, up to twice; other errors are thrown so callers keep
+// showing the previous data instead of rendering an error body.
+async function fetchJSON(url, retries = 2) {
+    const response = await fetch(url);
+    if (response.status === 429 && retries > 0) {
+        const wait = Math.min(parseFloat(response.headers.get('Retry-After')) || 1, 10);
+        await new Promise(resolve => setTimeout(resolve, wait * 1000));
+        return fetchJSON(url, retries - 1);
+    }
+    if (!response.ok) {
+        throw new Error(`${url} returned ${response.status}`);
+    }
+    return response.json();
+}
+
+// Theme management
+let currentTheme = 'day'; // 'day', 'night', 'system'
+
+function initTheme() {
+    // Load saved theme preference or default to 'system'
+    const savedTheme = localStorage.getItem('theme') || 'system';
+    currentTheme = savedTheme;
+    applyTheme();
+}
+
+function toggleThemeDropdown() {
+    const dropdown = document.getElementById('themeDropdownMenu');
+    dropdown.classList.toggle('active');
+}
+
+function selectTheme(theme) {
+    currentTheme = theme;
+    localStorage.setItem('theme', currentTheme);
+    applyTheme();
+    updateThemeCheckmarks();
+    // Close dropdown
+    document.getElementById('themeDropdownMenu').classList.remove('active');
+}
+
+function updateThemeCheckmarks() {
+    // Remove all active states
+    document.querySelectorAll('.theme-option').forEach(option => {
+        option.classList.remove('active');
+    });
+
+    // Add active state to current theme
+    const options = document.querySelectorAll('.theme-option');
+    if (currentTheme === 'day') {
+        options[0].classList.add('active');
+    } else if (currentTheme === 'night') {
+        options[1].classList.add('active');
+    } else {
+        options[2].classList.add('active');
+    }
+}
+
+function applyTheme() {
+    const themeToggle = document.getElementById('themeToggle');
+    const sunIcon = document.querySelector('.sun-icon');
+    const moonIcon = document.querySelector('.moon-icon');
+    const systemIcon = document.querySelector('.system-icon');
+    const body = document.body;
+
+    // Hide all icons first
+    sunIcon.style.display = 'none';
+    moonIcon.style.display = 'none';
+    systemIcon.style.display = 'none';
+
+    let shouldBeDark = false;
+
+    if (currentTheme === 'day') {
+        sunIcon.style.display = 'block';
+        shouldBeDark = false;
+    } else if (currentTheme === 'night') {
+        moonIcon.style.display = 'block';
+        shouldBeDark = true;
+    } else { // system
+        systemIcon.style.display = 'block';
+        // Check system preference
+        shouldBeDark = window.matchMedia('(prefers-color-scheme: dark)').matches;
+    }
+
+    // Apply or remove dark mode class
+    if (shouldBeDark) {
+        body.classList.add('dark-mode');
+    } else {
+        body.classList.remove('dark-mode');
+    }
+
+    // Update checkmarks
+    updateThemeCheckmarks();
+
+    // Re-render chart with new theme colors if it exists
+    if (spendingChart) {
+        loadSpendingComparison();
+    }
+}
+
+// Listen for system theme changes when in system mode
+window.matchMedia('(prefers-color-scheme: dark)').addEventListener('change', (e) => {
+    if (currentTheme === 'system') {
+        applyTheme();
+    }
+});
+
+// Close dropdown when clicking outside
+document.addEventListener('click', function(event) {
+    const dropdown = document.getElementById('themeDropdownMenu');
+    const toggleButton = document.getElementById('themeToggle');
+
+    if (!dropdown.contains(event.target) && !toggleButton.contains(event.target)) {
+        dropdown.classList.remove('active');
+    }
+});
+
+// Chart.js instance
+let spendingChart = null;
+
+// Client-side store, kept current with deltas from /api/changes
+const store = {
+    seq: null,
+    categories: new Map(),
+    budgets: new Map()
+};
+
+// Load data on page load
+async function loadData() {
+    // Take the change log position first, so anything written while
+    // loading is replayed by the next sync
+    const changesResponse = await fetch(`${API_URL}/changes`);
+    store.seq = (await changesResponse.json()).seq;
+
+    await loadCategories();
+    await loadIncomeCategories();
+    indexCategories();
+    await loadTransactions();
+    await loadBudgets();
+    await loadCategorySpending();
+    await loadSpendingComparison();
+    updateSummaryCards();
+}
+
+// Fetch only what changed since the last sync and apply it
+async function syncChanges() {
+    if (store.seq === null) {
+        await loadData();
+        return;
+    }
+
+    try {
+        const response = await fetch(`${API_URL}/changes?since=${store.seq}`);
+        const delta = await response.json();
+        store.seq = delta.seq;
+
+        applyCategoryChanges(delta);
+        applyTransactionChanges(delta);
+        applyBudgetChanges(delta);
+
+        populateCategoryDropdown();
+        renderTransactions(allTransactions);
+        renderCategoryDisplay(computeCategorySpending());
+        updateSummaryCards();
+    } catch (error) {
+        console.error('Error syncing changes:', error);
+    }
+}
+
+function indexCategories() {
+    store.categories.clear();
+    [...categories, ...incomeCategories].forEach(({ subcategories, ...category }) => {
+        store.categories.set(category.id, category);
+        (subcategories || []).forEach(({ subcategories, ...sub }) => store.categories.set(sub.id, sub));
+    });
+}
+
+function applyCategoryChanges(delta) {
+    if (delta.categories.length === 0 && delta.deleted_categories.length === 0) {
+        return;
+    }
+    delta.deleted_categories.forEach(id => store.categories.delete(id));
+    delta.categories.forEach(category => store.categories.set(category.id, category));
+
+    // Rebuild the category trees the rest of the page uses
+    const all = Array.from(store.categories.values()).sort((a, b) => a.id - b.id);
+    const tree = type => all
+        .filter(c => c.parent_id === null && c.category_type === type)
+        .map(c => ({
+            ...c,
+            subcategories: all.filter(s => s.parent_id === c.id).map(s => ({ ...s, subcategories: [] }))
+        }));
+    categories = tree('expense');
+    incomeCategories = tree('income');
+}
+
+function applyTransactionChanges(delta) {
+    if (delta.transactions.length === 0 && delta.deleted_transactions.length === 0) {
+        return;
+    }
+    const byId = new Map(allTransactions.map(t => [t.id, t]));
+    delta.deleted_transactions.forEach(id => byId.delete(id));
+    delta.transactions.forEach(t => byId.set(t.id, t));
+
+    allTransactions = Array.from(byId.values()).sort((a, b) =>
+        b.date.localeCompare(a.date) || b.id - a.id
+    );
+}
+
+function applyBudgetChanges(delta) {
+    const now = new Date();
+    delta.deleted_budgets.forEach(id => store.budgets.delete(id));
+    delta.budgets.forEach(budget => {
+        if (budget.month === now.getMonth() + 1 && budget.year === now.getFullYear()) {
+            store.budgets.set(budget.id, budget);
+        } else {
+            store.budgets.delete(budget.id);
+        }
+    });
+}
+
+// Same numbers as /api/category-spending, worked out from the store
+function computeCategorySpending() {
+    const now = new Date();
+    const monthPrefix = `${now.getFullYear()}-${String(now.getMonth() + 1).padStart(2, '0')}`;
+
+    const spentBy = new Map();
+    allTransactions.forEach(t => {
+        if (t.transaction_type === 'expense' && t.date.startsWith(monthPrefix)) {
+            spentBy.set(t.category_id, (spentBy.get(t.category_id) || 0) + t.amount);
+        }
+    });
+    const budgetBy = new Map();
+    store.budgets.forEach(b => budgetBy.set(b.category_id, (budgetBy.get(b.category_id) || 0) + b.amount));
+
+    return categories.map(cat => {
+        const ids = [cat.id, ...cat.subcategories.map(sub => sub.id)];
+        const amount = ids.reduce((sum, id) => sum + (spentBy.get(id) || 0), 0);
+        const budget = ids.reduce((sum, id) => sum + (budgetBy.get(id) || 0), 0);
+        return {
+            category_id: cat.id,
+            category_name: cat.name,
+            amount: amount,
+            budget: budget,
+            percentage: budget > 0 ? (amount / budget) * 100 : 0,
+            subcategory_count: cat.subcategories.length
+        };
+    });
+}
+
+// Load and render spending comparison chart
+async function loadSpendingComparison() {
+    try {
+        const data = await fetchJSON(`${API_URL}/spending-comparison`);
+        renderSpendingChart(data);
+    } catch (error) {
+        console.error('Error loading spending comparison:', error);
+    }
+}
+
+function renderSpendingChart(data) {
+    const ctx = document.getElementById('spendingChart');
+
+    // Destroy existing chart if it exists
+    if (spendingChart) {
+        spendingChart.destroy();
+    }
+
+    // Get month names
+    const monthNames = ['January', 'February', 'March', 'April', 'May', 'June',
+        'July', 'August', 'September', 'October', 'November', 'December'];
+
+    const currentMonthName = monthNames[data.current_month.month - 1];
+    const prevMonthName = monthNames[data.previous_month.month - 1];
+
+    // Determine if dark mode is active
+    const isDarkMode = document.body.classList.contains('dark-mode');
+    const textColor = isDarkMode ? '#e0e0e0' : '#2c3e50';
+    const gridColor = isDarkMode ? '#404040' : '#ecf0f1';
+
+    // Create budget line datasets (flat lines at budget amount)
+    const currentBudgetLine = new Array(data.days.length).fill(data.current_month.budget);
+    const prevBudgetLine = new Array(data.days.length).fill(data.previous_month.budget);
+
+    spendingChart = new Chart(ctx, {
+        type: 'line',
+        data: {
+            labels: data.days,
+            datasets: [
+                {
+                    label: `${currentMonthName} ${data.current_month.year}`,
+                    data: data.current_month.data,
+                    backgroundColor: 'rgba(52, 152, 219, 0.1)',
+                    borderColor: 'rgba(52, 152, 219, 1)',
+                    borderWidth: 3,
+                    fill: true,
+                    tension: 0.4,
+                    pointRadius: 4,
+                    pointHoverRadius: 6,
+                    pointBackgroundColor: 'rgba(52, 152, 219, 1)',
+                    pointBorderColor: '#ffffff',
+                    pointBorderWidth: 2
+                },
+                {
+                    label: `${currentMonthName} Budget`,
+                    data: currentBudgetLine,
+                    backgroundColor: 'transparent',
+                    borderColor: 'rgba(52, 152, 219, 0.5)',
+                    borderWidth: 2,
+                    borderDash: [5, 5],
+                    fill: false,
+                    tension: 0,
+                    pointRadius: 0,
+                    pointHoverRadius: 0
+                },
+                {
+                    label: `${prevMonthName} ${data.previous_month.year}`,
+                    data: data.previous_month.data,
+                    backgroundColor: 'rgba(149, 165, 166, 0.1)',
+                    borderColor: 'rgba(149, 165, 166, 1)',
+                    borderWidth: 3,
+                    fill: true,
+                    tension: 0.4,
+                    pointRadius: 4,
+                    pointHoverRadius: 6,
+                    pointBackgroundColor: 'rgba(149, 165, 166, 1)',
+                    pointBorderColor: '#ffffff',
+                    pointBorderWidth: 2
+                },
+                {
+                    label: `${prevMonthName} Budget`,
+                    data: prevBudgetLine,
+                    backgroundColor: 'transparent',
+                    borderColor: 'rgba(149, 165, 166, 0.5)',
+                    borderWidth: 2,
+                    borderDash: [5, 5],
+                    fill: false,
+                    tension: 0,
+                    pointRadius: 0,
+                    pointHoverRadius: 0
+                }
+            ]
+        },
+        options: {
+            responsive: true,
+            maintainAspectRatio: false,
+            plugins: {
+                legend: {
+                    position: 'top',
+                    labels: {
+                        color: textColor,
+                        font: {
+                            size: 12
+                        },
+                        padding: 15
+                    }
+                },
+                tooltip: {
+                    backgroundColor: isDarkMode ? '#2d2d2d' : 'rgba(0, 0, 0, 0.8)',
+                    titleColor: '#ffffff',
+                    bodyColor: '#ffffff',
+                    callbacks: {
+                        label: function(context) {
+                            let label = context.dataset.label || '';
+                            if (label) {
+                                label += ': ';
+                            }
+                            label += '$' + context.parsed.y.toFixed(2);
+                            return label;
+                        }
+                    }
+                }
+            },
+            scales: {
+                x: {
+                    title: {
+                        display: true,
+                        text: 'Day of Month',
+                        color: textColor,
+                        font: {
+                            size: 12,
+                            weight: 'bold'
+                        }
+                    },
+                    ticks: {
+                        color: textColor
+                    },
+                    grid: {
+                        color: gridColor
+                    }
+                },
+                y: {
+                    beginAtZero: true,
+                    title: {
+                        display: true,
+                        text: 'Cumulative Spending ($)',
+                        color: textColor,
+                        font: {
+                            size: 12,
+                            weight: 'bold'
+                        }
+                    },
+                    ticks: {
+                        color: textColor,
+                        callback: function(value) {
+                            return '$' + value.toFixed(0);
+                        }
+                    },
+                    grid: {
+                        color: gridColor
+                    }
+                }
+            }
+        }
+    });
+}
+
+// Load income categories from backend
+async function loadIncomeCategories() {
+    try {
+        const response = await fetch(`${API_URL}/categories?type=income`);
+        incomeCategories = await response.json();
+    } catch (error) {
+        console.error('Error loading income categories:', error);
+    }
+}
+
+// Load categories from backend
+async function loadCategories() {
+    try {
+        const response = await fetch(`${API_URL}/categories`);
+        categories = await response.json();
+        populateCategoryDropdown();
+    } catch (error) {
+        console.error('Error loading categories:', error);
+    }
+}
+
+// Load transactions from backend
+async function loadTransactions() {
+    try {
+        const response = await fetch(`${API_URL}/transactions`);
+        allTransactions = await response.json();
+        renderTransactions(allTransactions);
+    } catch (error) {
+        console.error('Error loading transactions:', error);
+    }
+}
+
+// Load this month's budgets from backend
+async function loadBudgets() {
+    try {
+        const response = await fetch(`${API_URL}/budgets`);
+        const budgets = await response.json();
+        store.budgets = new Map(budgets.map(b => [b.id, b]));
+    } catch (error) {
+        console.error('Error loading budgets:', error);
+    }
+}
+
+// Load category spending from backend
+async function loadCategorySpending() {
+    try {
+        const spending = await fetchJSON(`${API_URL}/category-spending`);
+        renderCategoryDisplay(spending);
+    } catch (error) {
+        console.error('Error loading category spending:', error);
+    }
+}
+
+// Render transactions list
+function renderTransactions(transactions) {
+    const list = document.getElementById('transactionList');
+    list.innerHTML = '';
+
+    if (transactions.length === 0) {
+        list.innerHTML = '<li style="padding: 2rem; text-align: center; color: #7f8c8d;">No transactions yet. Add your first transaction!</li>';
+        return;
+    }
+
+    transactions.slice(0, 10).forEach(transaction => {
+        const li = document.createElement('li');
+        li.className = 'transaction-item';
+        li.dataset.id = transaction.id;
+
+        // Get category name with proper hierarchy
+        let categoryName = 'Uncategorized';
+        if (transaction.category_id) {
+            // Use appropriate category list based on transaction type
+            const categoryList = transaction.transaction_type === 'income' ? incomeCategories : categories;
+
+            // First check if it's a top-level category
+            let category = categoryList.find(c => c.id === transaction.category_id);
+
+            if (category) {
+                categoryName = category.name;
+            } else {
+                // Check if it's a subcategory
+                for (const parentCat of categoryList) {
+                    if (parentCat.subcategories && parentCat.subcategories.length > 0) {
+                        const subcat = parentCat.subcategories.find(sc => sc.id === transaction.category_id);
+                        if (subcat) {
+                            categoryName = `${parentCat.name} > ${subcat.name}`;
+                            break;
+                        }
+                    }
+                }
+            }
+        }
+
+        const sign = transaction.transaction_type === 'income' ? '+' : '-';
+        const amountClass = transaction.transaction_type === 'income' ? 'positive' : 'negative';
+
+        // Format date for display
+        const transactionDate = new Date(transaction.date);
+        const formattedDate = transactionDate.toLocaleDateString('en-US', { month: 'short', day: 'numeric', year: 'numeric' });
+
+        li.innerHTML = `
+            <div class="transaction-info">
+                <span class="transaction-name">${transaction.description}</span>
+                <span class="transaction-category">${categoryName} • ${formattedDate}</span>
+            </div>
+            <div class="transaction-right">
+                <div class="transaction-actions">
+                    <button class="transaction-action-btn edit-btn" onclick="editTransaction(${transaction.id})" title="Edit">
+                        <svg width="16" height="16" viewBox="0 0 16 16" fill="currentColor">
+                            <path d="M12.146.146a.5.5 0 0 1 .708 0l3 3a.5.5 0 0 1 0 .708l-10 10a.5.5 0 0 1-.168.11l-5 2a.5.5 0 0 1-.65-.65l2-5a.5.5 0 0 1 .11-.168l10-10zM11.207 2.5L13.5 4.793 14.793 3.5 12.5 1.207 11.207 2.5zm1.586 3L10.5 3.207 4 9.707V10h.5a.5.5 0 0 1 .5.5v.5h.5a.5.5 0 0 1 .5.5v.5h.293l6.5-6.5z"/>
+                        </svg>
+                    </button>
+                    <button class="transaction-action-btn delete-btn" onclick="deleteTransaction(${transaction.id})" title="Delete">
+                        <svg width="16" height="16" viewBox="0 0 16 16" fill="currentColor">
+                            <path d="M5.5 5.5A.5.5 0 0 1 6 6v6a.5.5 0 0 1-1 0V6a.5.5 0 0 1 .5-.5zm2.5 0a.5.5 0 0 1 .5.5v6a.5.5 0 0 1-1 0V6a.5.5 0 0 1 .5-.5zm3 .5a.5.5 0 0 0-1 0v6a.5.5 0 0 0 1 0V6z"/>
+                            <path fill-rule="evenodd" d="M14.5 3a1 1 0 0 1-1 1H13v9a2 2 0 0 1-2 2H5a2 2 0 0 1-2-2V4h-.5a1 1 0 0 1-1-1V2a1 1 0 0 1 1-1H6a1 1 0 0 1 1-1h2a1 1 0 0 1 1 1h3.5a1 1 0 0 1 1 1v1zM4.118 4L4 4.059V13a1 1 0 0 0 1 1h6a1 1 0 0 0 1-1V4.059L11.882 4H4.118zM2.5 3V2h11v1h-11z"/>
+                        </svg>
+                    </button>
+                </div>
+                <span class="transaction-amount ${amountClass}">${sign}$${transaction.amount.toFixed(2)}</span>
+            </div>
+        `;
+        list.appendChild(li);
+    });
+}
+
+// Edit transaction - open modal with pre-filled data
+function editTransaction(id) {
+    const transaction = allTransactions.find(t => t.id === id);
+    if (!transaction) return;
+
+    // Store that we're editing
+    editingTransactionId = id;
+    originalTransactionData = { ...transaction };
+
+    // Update modal title
+    document.getElementById('transactionModalTitle').textContent = 'Edit Transaction';
+    document.getElementById('saveButtonText').textContent = 'Save Changes';
+
+    // Set transaction type and disable toggle during edit
+    currentTransactionType = transaction.transaction_type;
+    const expenseBtn = document.querySelector('.type-btn.expense');
+    const incomeBtn = document.querySelector('.type-btn.income');
+
+    document.querySelectorAll('.type-btn').forEach(btn => btn.classList.remove('active'));
+    if (transaction.transaction_type === 'income') {
+        incomeBtn.classList.add('active');
+    } else {
+        expenseBtn.classList.add('active');
+    }
+
+    // Disable type toggle when editing
+    document.getElementById('transactionTypeToggle').style.pointerEvents = 'none';
+    document.getElementById('transactionTypeToggle').style.opacity = '0.6';
+
+    // Populate form fields
+    document.getElementById('transactionName').value = transaction.description;
+    document.getElementById('transactionAmount').value = transaction.amount;
+
+    // Format date for input
+    const transactionDate = new Date(transaction.date);
+    document.getElementById('transactionDate').value = transactionDate.toISOString().split('T')[0];
+
+    document.getElementById('transactionNotes').value = transaction.notes || '';
+
+    // Populate categories and select the right one
+    populateCategoryDropdown(transaction.transaction_type);
+    document.getElementById('transactionCategory').value = transaction.category_id;
+
+    // Open modal
+    document.getElementById('transactionModal').classList.add('active');
+}
+
+// Delete transaction
+async function deleteTransaction(id) {
+    if (!confirm('Are you sure you want to delete this transaction?')) {
+        return;
+    }
+
+    try {
+        const response = await fetch(`${API_URL}/transactions/${id}`, {
+            method: 'DELETE'
+        });
+
+        if (response.ok) {
+            await syncChanges();
+        } else {
+            alert('Failed to delete transaction');
+        }
+    } catch (error) {
+        console.error('Error deleting transaction:', error);
+        alert('Error deleting transaction. Please try again.');
+    }
+}
+
+// Update summary cards
+function updateSummaryCards() {
+    try {
+        const transactions = allTransactions;
+
+        const income = transactions
+            .filter(t => t.transaction_type === 'income')
+            .reduce((sum, t) => sum + t.amount, 0);
+
+        const expenses = transactions
+            .filter(t => t.transaction_type === 'expense')
+            .reduce((sum, t) => sum + t.amount, 0);
+
+        const balance = income - expenses;
+
+        document.getElementById('totalIncome').textContent = `$${income.toFixed(2)}`;
+        document.getElementById('totalExpenses').textContent = `$${expenses.toFixed(2)}`;
+        document.getElementById('currentBalance').textContent = `$${balance.toFixed(2)}`;
+    } catch (error) {
+        console.error('Error updating summary:', error);
+    }
+}
+
+// Populate category dropdown in transaction form
+function populateCategoryDropdown(transactionType = 'expense') {
+    const select = document.getElementById('transactionCategory');
+    select.innerHTML = '<option value="">Select a category</option>';
+
+    // Use income categories for income transactions, expense categories for expense transactions
+    const categoriesToUse = transactionType === 'income' ? incomeCategories : categories;
+
+    if (categoriesToUse.length === 0) {
+        const option = document.createElement('option');
+        option.value = '';
+        option.textContent = `No ${transactionType} categories available`;
+        option.disabled = true;
+        select.appendChild(option);
+        return;
+    }
+
+    categoriesToUse.forEach(category => {
+        const option = document.createElement('option');
+        option.value = category.id;
+        option.textContent = category.name;
+        select.appendChild(option);
+
+        // Add subcategories
+        if (category.subcategories && category.subcategories.length > 0) {
+            category.subcategories.forEach(sub => {
+                const subOption = document.createElement('option');
+                subOption.value = sub.id;
+                subOption.textContent = `  ↳ ${sub.name}`;
+                select.appendChild(subOption);
+            });
+        }
+    });
+}
+
+// Render category spending display
+function renderCategoryDisplay(spending) {
+    const display = document.getElementById('categoryDisplay');
+    display.innerHTML = '';
+
+    if (spending.length === 0) {
+        display.innerHTML = '<p style="padding: 1rem; text-align: center; color: #7f8c8d;">No categories yet</p>';
+        return;
+    }
+
+    spending.forEach(item => {
+        const categoryItem = document.createElement('div');
+        categoryItem.className = 'category-item clickable';
+        categoryItem.onclick = () => openCategoryDetails(item.category_id);
+
+        let badgeHTML = '';
+        if (item.subcategory_count > 0) {
+            badgeHTML = `<span class="subcategory-badge">${item.subcategory_count}</span>`;
+        }
+
+        // Calculate percentage and determine bar width and text
+        let budgetPercentage = item.percentage || 0;
+        let barWidth = Math.min(budgetPercentage, 100);
+        let percentageText = '';
+        let budgetInfoHTML = '';
+
+        if (item.budget > 0) {
+            if (budgetPercentage > 100) {
+                // Over budget - show as full bar and display over-budget percentage
+                barWidth = 100;
+                const overPercentage = budgetPercentage - 100;
+                percentageText = `${budgetPercentage.toFixed(0)}% (${overPercentage.toFixed(0)}% over)`;
+            } else {
+                percentageText = `${budgetPercentage.toFixed(0)}%`;
+            }
+            budgetInfoHTML = `<span class="category-budget-info">${percentageText} of $${item.budget.toFixed(2)}</span>`;
+        } else {
+            budgetInfoHTML = `<span class="category-budget-info no-budget">No budget set</span>`;
+        }
+
+        // Determine gradient class based on percentage
+        let gradientClass = 'low';
+        if (budgetPercentage >= 100) {
+            gradientClass = 'over';
+        } else if (budgetPercentage >= 80) {
+            gradientClass = 'high';
+        } else if (budgetPercentage >= 50) {
+            gradientClass = 'medium';
+        }
+
+        categoryItem.innerHTML = `
+            <div class="category-name-section">
+                <span class="category-name">${item.category_name}</span>
+                ${badgeHTML}
+            </div>
+            <div class="category-budget-bar">
+                <div class="category-budget-bar-fill gradient-${gradientClass}" style="width: ${barWidth}%;"></div>
+            </div>
+            <div class="category-right-section">
+                <span class="category-amount">$${item.amount.toFixed(2)}</span>
+                ${budgetInfoHTML}
+            </div>
+        `;
+
+        display.appendChild(categoryItem);
+    });
+}
+
+// Transaction Modal Functions
+function openTransactionModal() {
+    // Reset to add mode
+    editingTransactionId = null;
+    originalTransactionData = null;
+
+    document.getElementById('transactionModalTitle').textContent = 'Add Transaction';
+    document.getElementById('saveButtonText').textContent = 'Save';
+
+    // Enable type toggle
+    document.getElementById('transactionTypeToggle').style.pointerEvents = 'auto';
+    document.getElementById('transactionTypeToggle').style.opacity = '1';
+
+    // Reset to expense type
+    currentTransactionType = 'expense';
+    document.querySelectorAll('.type-btn').forEach(btn => btn.classList.remove('active'));
+    document.querySelector('.type-btn.expense').classList.add('active');
+
+    document.getElementById('transactionModal').classList.add('active');
+    document.getElementById('transactionDate').valueAsDate = new Date();
+
+    // Populate categories based on current transaction type (defaults to expense)
+    populateCategoryDropdown(currentTransactionType);
+}
+
+function closeTransactionModal() {
+    document.getElementById('transactionModal').classList.remove('active');
+    document.getElementById('transactionForm').reset();
+
+    // Reset state
+    editingTransactionId = null;
+    originalTransactionData = null;
+    currentTransactionType = 'expense';
+
+    // Re-enable type toggle
+    document.getElementById('transactionTypeToggle').style.pointerEvents = 'auto';
+    document.getElementById('transactionTypeToggle').style.opacity = '1';
+
+    // Reset to expense
+    const expenseBtn = document.querySelector('.type-btn.expense');
+    if (expenseBtn) {
+        document.querySelectorAll('.type-btn').forEach(btn => btn.classList.remove('active'));
+        expenseBtn.classList.add('active');
+    }
+}
+
+// Discard changes in modal
+function discardTransactionChanges() {
+    if (editingTransactionId !== null) {
+        // Editing mode - just close
+        closeTransactionModal();
+    } else {
+        // Add mode - close
+        closeTransactionModal();
+    }
+}
+
+function setTransactionType(type, button) {
+    currentTransactionType = type;
+    document.querySelectorAll('.type-btn').forEach(btn => btn.classList.remove('active'));
+    button.classList.add('active');
+    // Refresh the category dropdown to show appropriate categories
+    populateCategoryDropdown(type);
+
+    // Update description field requirement based on transaction type
+    const descriptionField = document.getElementById('transactionName');
+    if (type === 'income') {
+        descriptionField.removeAttribute('required');
+        descriptionField.placeholder = 'e.g., Monthly salary (optional)';
+    } else {
+        descriptionField.setAttribute('required', 'required');
+        descriptionField.placeholder = 'e.g., Grocery shopping';
+    }
+}
+
+async function handleTransactionSubmit(event) {
+    event.preventDefault();
+
+    const formData = new FormData(event.target);
+    let description = formData.get('name') || '';
+
+    // If income and no description provided, use category name
+    if (currentTransactionType === 'income' && !description.trim()) {
+        const categoryId = parseInt(formData.get('category'));
+        const category = incomeCategories.find(c => c.id === categoryId);
+        description = category ? category.name : 'Income';
+    }
+
+    const transaction = {
+        description: description,
+        amount: parseFloat(formData.get('amount')),
+        date: formData.get('date'),
+        transaction_type: currentTransactionType,
+        category_id: parseInt(formData.get('category')) || null,
+        notes: formData.get('notes')
+    };
+
+    try {
+        let response;
+        if (editingTransactionId !== null) {
+            // Edit mode - PUT request
+            response = await fetch(`${API_URL}/transactions/${editingTransactionId}`, {
+                method: 'PUT',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+                body: JSON.stringify(transaction)
+            });
+        } else {
+            // Add mode - POST request
+            response = await fetch(`${API_URL}/transactions`, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+                body: JSON.stringify(transaction)
+            });
+        }
+
+        if (response.ok) {
+            const message = editingTransactionId !== null ? 'Transaction updated successfully!' : 'Transaction added successfully!';
+            alert(message);
+            closeTransactionModal();
+            event.target.reset();
+            await syncChanges();
+        } else {
+            alert('Failed to save transaction');
+        }
+    } catch (error) {
+        console.error('Error saving transaction:', error);
+        alert('Error saving transaction. Please try again.');
+    }
+}
+
+// Categories Modal Functions
+function openCategoriesModal() {
+    renderCategories();
+    document.getElementById('categoriesModal').classList.add('active');
+}
+
+function closeCategoriesModal() {
+    document.getElementById('categoriesModal').classList.remove('active');
+    syncChanges();
+}
+
+function renderCategories() {
+    const manager = document.getElementById('categoryManager');
+    manager.innerHTML = '';
+
+    categories.forEach(category => {
+        const categoryDiv = document.createElement('div');
+        categoryDiv.className = 'category-tree-item';
+
+        const categoryRow = document.createElement('div');
+        categoryRow.className = 'category-row';
+        categoryRow.innerHTML = `
+            <span class="category-icon">📁</span>
+            <input type="text" value="${category.name}" onchange="updateCategoryName(${category.id}, this.value)">
+            <button class="btn-small btn-add-sub" onclick="addSubcategory(${category.id})">+ Sub</button>
+            <button class="btn-small btn-delete" onclick="deleteCategory(${category.id})">Delete</button>
+        `;
+
+        categoryDiv.appendChild(categoryRow);
+
+        if (category.subcategories && category.subcategories.length > 0) {
+            const subContainer = document.createElement('div');
+            subContainer.className = 'subcategory-container';
+
+            category.subcategories.forEach(sub => {
+                const subRow = document.createElement('div');
+                subRow.className = 'category-row subcategory';
+                subRow.innerHTML = `
+                    <span class="category-icon">📄</span>
+                    <input type="text" value="${sub.name}" onchange="updateSubcategoryName(${sub.id}, this.value)">
+                    <button class="btn-small btn-delete" onclick="deleteCategory(${sub.id})">Delete</button>
+                `;
+                subContainer.appendChild(subRow);
+            });
+
+            categoryDiv.appendChild(subContainer);
+        }
+
+        manager.appendChild(categoryDiv);
+    });
+}
+
+async function updateCategoryName(categoryId, newName) {
+    try {
+        await fetch(`${API_URL}/categories/${categoryId}`, {
+            method: 'PUT',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ name: newName })
+        });
+    } catch (error) {
+        console.error('Error updating category:', error);
+    }
+}
+
+async function updateSubcategoryName(subId, newName) {
+    await updateCategoryName(subId, newName);
+}
+
+async function addSubcategory(parentId) {
+    try {
+        const response = await fetch(`${API_URL}/categories`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({
+                name: 'New Subcategory',
+                parent_id: parentId
+            })
+        });
+
+        if (response.ok) {
+            await syncChanges();
+            renderCategories();
+        }
+    } catch (error) {
+        console.error('Error adding subcategory:', error);
+    }
+}
+
+async function deleteCategory(categoryId) {
+    if (!confirm('Delete this category? This will also delete all its subcategories.')) {
+        return;
+    }
+    const mode = confirm('Also delete its transactions? Press Cancel to keep them as uncategorized.') ? 'delete' : 'uncategorize';
+
+    try {
+        await fetch(`${API_URL}/categories/${categoryId}?transactions=${mode}`, {
+            method: 'DELETE'
+        });
+        await syncChanges();
+        renderCategories();
+    } catch (error) {
+        console.error('Error deleting category:', error);
+    }
+}
+
+async function addNewCategory() {
+    const input = document.getElementById('newCategoryInput');
+    const categoryName = input.value.trim();
+
+    if (!categoryName) return;
+
+    try {
+        const response = await fetch(`${API_URL}/categories`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({
+                name: categoryName,
+                parent_id: null
+            })
+        });
+
+        if (response.ok) {
+            input.value = '';
+            await syncChanges();
+            renderCategories();
+        }
+    } catch (error) {
+        console.error('Error adding category:', error);
+    }
+}
+
+// Income Categories Modal Functions
+function openAddIncomeCategoryModal() {
+    renderIncomeCategories();
+    document.getElementById('incomeCategoriesModal').classList.add('active');
+}
+
+function closeIncomeCategoriesModal() {
+    document.getElementById('incomeCategoriesModal').classList.remove('active');
+    syncChanges();
+    if (currentSection === 'budget') {
+        loadBudgetData();
+    }
+}
+
+function renderIncomeCategories() {
+    const manager = document.getElementById('incomeCategoryManager');
+    manager.innerHTML = '';
+
+    if (incomeCategories.length === 0) {
+        manager.innerHTML = '<p style="padding: 1rem; text-align: center; color: #7f8c8d;">No income sources yet. Add your first income source below!</p>';
+        return;
+    }
+
+    incomeCategories.forEach(category => {
+        const categoryDiv = document.createElement('div');
+        categoryDiv.className = 'category-tree-item';
+
+        const categoryRow = document.createElement('div');
+        categoryRow.className = 'category-row';
+        categoryRow.innerHTML = `
+            <span class="category-icon">💰</span>
+            <input type="text" value="${category.name}" onchange="updateIncomeCategoryName(${category.id}, this.value)">
+            <button class="btn-small btn-delete" onclick="deleteIncomeCategory(${category.id})">Delete</button>
+        `;
+
+        categoryDiv.appendChild(categoryRow);
+        manager.appendChild(categoryDiv);
+    });
+}
+
+async function updateIncomeCategoryName(categoryId, newName) {
+    try {
+        await fetch(`${API_URL}/categories/${categoryId}`, {
+            method: 'PUT',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ name: newName })
+        });
+    } catch (error) {
+        console.error('Error updating income category:', error);
+    }
+}
+
+async function deleteIncomeCategory(categoryId) {
+    if (!confirm('Delete this income source?')) {
+        return;
+    }
+    const mode = confirm('Also delete its transactions? Press Cancel to keep them as uncategorized.') ? 'delete' : 'uncategorize';
+
+    try {
+        await fetch(`${API_URL}/categories/${categoryId}?transactions=${mode}`, {
+            method: 'DELETE'
+        });
+        await syncChanges();
+        renderIncomeCategories();
+    } catch (error) {
+        console.error('Error deleting income category:', error);
+    }
+}
+
+async function addNewIncomeCategory() {
+    console.log('addNewIncomeCategory called');
+    const input = document.getElementById('newIncomeCategoryInput');
+    const categoryName = input.value.trim();
+    console.log('Category name:', categoryName);
+
+    if (!categoryName) {
+        console.log('No category name provided');
+        return;
+    }
+
+    try {
+        console.log('Sending request to create income category');
+        const response = await fetch(`${API_URL}/categories`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({
+                name: categoryName,
+                parent_id: null,
+                category_type: 'income'
+            })
+        });
+
+        console.log('Response status:', response.status);
+        if (response.ok) {
+            console.log('Income category added successfully');
+            input.value = '';
+            await syncChanges();
+            renderIncomeCategories();
+        } else {
+            console.error('Failed to add income category:', response.statusText);
+        }
+    } catch (error) {
+        console.error('Error adding income category:', error);
+    }
+}
+
+// Category Details Modal Functions
+async function openCategoryDetails(categoryId) {
+    try {
+        const now = new Date();
+        const month = now.getMonth() + 1;
+        const year = now.getFullYear();
+
+        const data = await fetchJSON(`${API_URL}/category-details/${categoryId}?month=${month}&year=${year}`);
+
+        // Update modal title
+        document.getElementById('categoryDetailsTitle').textContent = data.category_name;
+
+        // Render category details
+        renderCategoryDetails(data);
+
+        // Open modal
+        document.getElementById('categoryDetailsModal').classList.add('active');
+    } catch (error) {
+        console.error('Error loading category details:', error);
+        alert('Error loading category details. Please try again.');
+    }
+}
+
+function renderCategoryDetails(data) {
+    const content = document.getElementById('categoryDetailsContent');
+
+    // Calculate percentage for parent category
+    let parentPercentage = 0;
+    let parentBarWidth = 0;
+    let parentGradientClass = 'low';
+
+    if (data.budget > 0) {
+        parentPercentage = (data.spent / data.budget) * 100;
+        parentBarWidth = Math.min(parentPercentage, 100);
+
+        if (parentPercentage >= 100) {
+            parentGradientClass = 'over';
+        } else if (parentPercentage >= 80) {
+            parentGradientClass = 'high';
+        } else if (parentPercentage >= 50) {
+            parentGradientClass = 'medium';
+        }
+    }
+
+    let html = `
+        <div class="category-details-summary">
+            <div class="details-row">
+                <span class="details-label">Total Spent:</span>
+                <span class="details-value spent">$${data.spent.toFixed(2)}</span>
+            </div>
+            <div class="details-row">
+                <span class="details-label">Budget:</span>
+                <span class="details-value">${data.budget > 0 ? '$' + data.budget.toFixed(2) : 'Not set'}</span>
+            </div>
+            ${data.budget > 0 ? `
+            <div class="details-row">
+                <span class="details-label">Remaining:</span>
+                <span class="details-value ${data.budget - data.spent >= 0 ? 'positive' : 'negative'}">$${(data.budget - data.spent).toFixed(2)}</span>
+            </div>
+            <div class="category-detail-bar-container">
+                <div class="category-budget-bar large">
+                    <div class="category-budget-bar-fill gradient-${parentGradientClass}" style="width: ${parentBarWidth}%;"></div>
+                </div>
+                <span class="category-detail-percentage">${parentPercentage.toFixed(0)}%</span>
+            </div>
+            ` : ''}
+        </div>
+    `;
+
+    // Add subcategories if they exist
+    if (data.subcategories && data.subcategories.length > 0) {
+        html += `
+            <div class="category-details-subcategories">
+                <h3>Subcategories</h3>
+                <div class="subcategory-list">
+        `;
+
+        data.subcategories.forEach(sub => {
+            let subPercentage = 0;
+            let subBarWidth = 0;
+            let subGradientClass = 'low';
+
+            if (sub.budget > 0) {
+                subPercentage = (sub.spent / sub.budget) * 100;
+                subBarWidth = Math.min(subPercentage, 100);
+
+                if (subPercentage >= 100) {
+                    subGradientClass = 'over';
+                } else if (subPercentage >= 80) {
+                    subGradientClass = 'high';
+                } else if (subPercentage >= 50) {
+                    subGradientClass = 'medium';
+                }
+            }
+
+            html += `
+                <div class="subcategory-detail-item">
+                    <div class="subcategory-detail-header">
+                        <span class="subcategory-detail-name">${sub.name}</span>
+                        <span class="subcategory-detail-amount">$${sub.spent.toFixed(2)}</span>
+                    </div>
+                    ${sub.budget > 0 ? `
+                    <div class="subcategory-detail-budget">
+                        <span class="budget-text">Budget: $${sub.budget.toFixed(2)}</span>
+                        <span class="budget-remaining ${sub.budget - sub.spent >= 0 ? 'positive' : 'negative'}">
+                            $${(sub.budget - sub.spent).toFixed(2)} remaining
+                        </span>
+                    </div>
+                    <div class="category-detail-bar-container">
+                        <div class="category-budget-bar">
+                            <div class="category-budget-bar-fill gradient-${subGradientClass}" style="width: ${subBarWidth}%;"></div>
+                        </div>
+                        <span class="category-detail-percentage">${subPercentage.toFixed(0)}%</span>
+                    </div>
+                    ` : `
+                    <div class="subcategory-detail-budget">
+                        <span class="budget-text no-budget">No budget set</span>
+                    </div>
+                    `}
+                </div>
+            `;
+        });
+
+        html += `
+                </div>
+            </div>
+        `;
+    }
+
+    content.innerHTML = html;
+}
+
+function closeCategoryDetailsModal() {
+    document.getElementById('categoryDetailsModal').classList.remove('active');
+}
+
+// Close modals when clicking outside
+window.onclick = function(event) {
+    const transactionModal = document.getElementById('transactionModal');
+    const categoriesModal = document.getElementById('categoriesModal');
+    const incomeCategoriesModal = document.getElementById('incomeCategoriesModal');
+    const categoryDetailsModal = document.getElementById('categoryDetailsModal');
+
+    if (event.target === transactionModal) {
+        closeTransactionModal();
+    }
+    if (event.target === categoriesModal) {
+        closeCategoriesModal();
+    }
+    if (event.target === incomeCategoriesModal) {
+        closeIncomeCategoriesModal();
+    }
+    if (event.target === categoryDetailsModal) {
+        closeCategoryDetailsModal();
+    }
+};
+
+// Initialize app
+window.onload = function() {
+    initTheme();
+    loadData();
+    updateMonthYearDisplay();
+    setupNavigation();
+};
+
+// Setup Navigation Event Listeners
+function setupNavigation() {
+    document.getElementById('navDashboard').addEventListener('click', function(e) {
+        e.preventDefault();
+        showSection('dashboard');
+    });
+
+    document.getElementById('navBudget').addEventListener('click', function(e) {
+        e.preventDefault();
+        showSection('budget');
+    });
+
+    document.getElementById('navTransactions').addEventListener('click', function(e) {
+        e.preventDefault();
+        showSection('dashboard'); // For now, stays on dashboard
+    });
+
+    document.getElementById('navReports').addEventListener('click', function(e) {
+        e.preventDefault();
+        showSection('dashboard'); // For now, stays on dashboard
+    });
+}
+
+// Section Navigation
+function showSection(section) {
+    console.log('Switching to section:', section);
+    currentSection = section;
+    document.querySelectorAll('.page-section').forEach(s => {
+        s.classList.remove('active');
+        console.log('Removed active from:', s.id);
+    });
+
+    if (section === 'dashboard') {
+        document.getElementById('dashboardSection').classList.add('active');
+        console.log('Activated dashboard');
+    } else if (section === 'budget') {
+        document.getElementById('budgetSection').classList.add('active');
+        console.log('Activated budget');
+        loadBudgetData();
+    }
+}
+
+// Budget Functions
+function updateMonthYearDisplay() {
+    const monthNames = ['January', 'February', 'March', 'April', 'May', 'June',
+        'July', 'August', 'September', 'October', 'November', 'December'];
+    document.getElementById('currentMonthYear').textContent = 
+        `${monthNames[currentBudgetMonth - 1]} ${currentBudgetYear}`;
+}
+
+function changeMonth(direction) {
+    currentBudgetMonth += direction;
+    if (currentBudgetMonth > 12) {
+        currentBudgetMonth = 1;
+        currentBudgetYear++;
+    } else if (currentBudgetMonth < 1) {
+        currentBudgetMonth = 12;
+        currentBudgetYear--;
+    }
+    updateMonthYearDisplay();
+    loadBudgetData();
+}
+
+async function loadBudgetData() {
+    try {
+        // Expense and income overviews, one request each
+        const overviewUrl = `${API_URL}/budget-overview?month=${currentBudgetMonth}&year=${currentBudgetYear}`;
+        const [budgetData, incomeData] = await Promise.all([
+            fetchJSON(`${overviewUrl}&type=expense`),
+            fetchJSON(`${overviewUrl}&type=income`)
+        ]);
+        renderBudgetTable(budgetData);
+        updateBudgetSummary(budgetData, incomeData);
+        renderIncomeTable(incomeData);
+        updateIncomeSummary(incomeData);
+    } catch (error) {
+        console.error('Error loading budget data:', error);
+    }
+}
+
+function renderIncomeTable(incomeData) {
+    const tbody = document.getElementById('incomeTableBody');
+    tbody.innerHTML = '';
+
+    if (incomeData.length === 0) {
+        tbody.innerHTML = '<tr><td colspan="5" style="text-align: center; padding: 2rem; color: #7f8c8d;">No income sources found. Click "Add Income Source" to get started!</td></tr>';
+        return;
+    }
+
+    incomeData.forEach(item => {
+        const tr = document.createElement('tr');
+        const difference = item.actual - item.budgeted;
+        const differenceClass = difference >= 0 ? 'positive' : 'negative';
+        const status = difference >= 0 ? '✓ Met' : '⚠ Under';
+        const statusClass = difference >= 0 ? 'good' : 'under';
+
+        tr.innerHTML = `
+            <td>
+                <strong>${item.category_name}</strong>
+            </td>
+            <td>
+                <input type="number"
+                       class="budget-input"
+                       value="${item.budgeted}"
+                       min="0"
+                       step="0.01"
+                       onchange="updateBudget(${item.category_id}, this.value)"
+                       placeholder="0.00">
+            </td>
+            <td class="income-amount">${item.actual.toFixed(2)}</td>
+            <td class="difference-amount ${differenceClass}">
+                ${difference >= 0 ? '+' : ''}${difference.toFixed(2)}
+            </td>
+            <td>
+                <span class="progress-text ${statusClass}">${status}</span>
+            </td>
+        `;
+        tbody.appendChild(tr);
+    });
+}
+
+function updateIncomeSummary(incomeData) {
+    const totalExpected = incomeData.reduce((sum, item) => sum + item.budgeted, 0);
+    const totalActual = incomeData.reduce((sum, item) => sum + item.actual, 0);
+
+    document.getElementById('totalExpectedIncome').textContent = `$${totalExpected.toFixed(2)}`;
+    document.getElementById('totalActualIncome').textContent = `$${totalActual.toFixed(2)}`;
+}
+
+function renderBudgetTable(budgetData) {
+    const tbody = document.getElementById('budgetTableBody');
+    tbody.innerHTML = '';
+
+    if (budgetData.length === 0) {
+        tbody.innerHTML = '<tr><td colspan="5" style="text-align: center; padding: 2rem; color: #7f8c8d;">No categories found. Add categories first!</td></tr>';
+        return;
+    }
+
+    budgetData.forEach(item => {
+        // Render parent category row
+        const tr = document.createElement('tr');
+        tr.className = 'parent-category-row';
+        const remaining = item.budgeted - item.actual;
+        const percentage = item.budgeted > 0 ? (item.actual / item.budgeted) * 100 : 0;
+        const progressClass = percentage > 100 ? 'over-budget' : percentage > 80 ? 'warning' : 'good';
+
+        tr.innerHTML = `
+            <td>
+                <strong>${item.category_name}</strong>
+                ${item.subcategory_count > 0 ? `<span class="subcategory-badge">${item.subcategory_count}</span>` : ''}
+            </td>
+            <td class="parent-budget-cell">
+                <strong>$${item.budgeted.toFixed(2)}</strong>
+            </td>
+            <td class="spent-amount"><strong>$${item.actual.toFixed(2)}</strong></td>
+            <td class="remaining-amount ${remaining < 0 ? 'negative' : 'positive'}">
+                <strong>$${remaining.toFixed(2)}</strong>
+            </td>
+            <td>
+                <div class="progress-bar">
+                    <div class="progress-bar-fill ${progressClass}" style="width: ${Math.min(percentage, 100)}%"></div>
+                </div>
+                <span class="progress-text">${percentage.toFixed(0)}%</span>
+            </td>
+        `;
+        tbody.appendChild(tr);
+
+        // Render subcategory rows if they exist
+        if (item.subcategories && item.subcategories.length > 0) {
+            item.subcategories.forEach(sub => {
+                const subTr = document.createElement('tr');
+                subTr.className = 'subcategory-row';
+                const subRemaining = sub.budgeted - sub.actual;
+                const subPercentage = sub.budgeted > 0 ? (sub.actual / sub.budgeted) * 100 : 0;
+                const subProgressClass = subPercentage > 100 ? 'over-budget' : subPercentage > 80 ? 'warning' : 'good';
+
+                subTr.innerHTML = `
+                    <td class="subcategory-name">
+                        <span class="subcategory-indent">↳</span> ${sub.category_name}
+                    </td>
+                    <td>
+                        <input type="number"
+                               class="budget-input budget-input-small"
+                               value="${sub.budgeted}"
+                               min="0"
+                               step="0.01"
+                               onchange="updateBudget(${sub.category_id}, this.value)"
+                               placeholder="0.00">
+                    </td>
+                    <td class="spent-amount">$${sub.actual.toFixed(2)}</td>
+                    <td class="remaining-amount ${subRemaining < 0 ? 'negative' : 'positive'}">
+                        $${subRemaining.toFixed(2)}
+                    </td>
+                    <td>
+                        <div class="progress-bar progress-bar-small">
+                            <div class="progress-bar-fill ${subProgressClass}" style="width: ${Math.min(subPercentage, 100)}%"></div>
+                        </div>
+                        <span class="progress-text progress-text-small">${subPercentage.toFixed(0)}%</span>
+                    </td>
+                `;
+                tbody.appendChild(subTr);
+            });
+        }
+    });
+}
+
+function updateBudgetSummary(budgetData, incomeData) {
+    const totalBudgeted = budgetData.reduce((sum, item) => sum + item.budgeted, 0);
+    const totalExpectedIncome = incomeData.reduce((sum, item) => sum + item.budgeted, 0);
+
+    // Calculate remaining: Expected Income - Total Budget
+    const totalRemaining = totalExpectedIncome - totalBudgeted;
+
+    document.getElementById('totalExpectedIncomeCard').textContent = `$${totalExpectedIncome.toFixed(2)}`;
+    document.getElementById('totalBudgeted').textContent = `$${totalBudgeted.toFixed(2)}`;
+    document.getElementById('totalRemaining').textContent = `$${totalRemaining.toFixed(2)}`;
+
+    // Update color of remaining amount
+    const remainingEl = document.getElementById('totalRemaining');
+    remainingEl.parentElement.className = totalRemaining < 0 ? 'card expenses' : 'card balance';
+}
+
+async function updateBudget(categoryId, amount) {
+    try {
+        await fetch(`${API_URL}/budgets`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({
+                category_id: categoryId,
+                amount: parseFloat(amount) || 0,
+                month: currentBudgetMonth,
+                year: currentBudgetYear
+            })
+        });
+        await loadBudgetData();
+        await syncChanges();
+    } catch (error) {
+        console.error('Error updating budget:', error);
+        alert('Error updating budget. Please try again.');
+    }
+}